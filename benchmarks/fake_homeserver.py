@@ -0,0 +1,288 @@
+"""Local stand-in for the REST API of CLAGE Homeservers.
+
+Serves the status, setup and consumption endpoints for a number of
+homeservers, each on its own port, over HTTPS with a self-signed
+certificate (created with the openssl command line tool). Every response
+can be delayed and can fail with a given rate. The status of all heaters at
+once (GET /devices/status) is an assumption of the integration, that can be
+switched off to test the fallback to the status of every heater on its own
+(GET /devices/status/<heaterId>, which the library uses).
+
+Run alone for manual tests:
+
+    python benchmarks/fake_homeserver.py --homeservers 2 --heaters-per-homeserver 3
+"""
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+POWER_MAX = 140  # 21 kW
+DRAWING_PROBABILITY = 0.2
+
+
+def heater_ids(homeserver, heaters_per_homeserver):
+    """Return the ids of the heaters of a homeserver"""
+    return [f"{homeserver:04X}{heater:06X}" for heater in range(heaters_per_homeserver)]
+
+
+def create_ssl_context(directory):
+    """Create a server SSL context with a new self-signed certificate"""
+    certificate = Path(directory) / "homeserver.crt"
+    key = Path(directory) / "homeserver.key"
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "1",
+            "-subj",
+            "/CN=localhost",
+            "-keyout",
+            str(key),
+            "-out",
+            str(certificate),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certificate, key)
+    return context
+
+
+class FakeHomeserver:
+    """The heaters of a homeserver with a little random activity"""
+
+    def __init__(self, ids, latency, jitter, failure_rate, status_of_all_heaters):
+        self._ids = ids
+        self._status_of_all_heaters = status_of_all_heaters
+        self._latency = latency
+        self._jitter = jitter
+        self._failure_rate = failure_rate
+        self._totals = {heater_id: [0, 0, 0] for heater_id in ids}
+        self.requests = 0
+        self.failures = 0
+
+    def _status(self, heater_id):
+        drawing = random.random() < DRAWING_PROBABILITY
+        flow = random.randint(40, 120) if drawing else 0
+        power = random.randint(40, POWER_MAX) if drawing else 0
+        if drawing:
+            totals = self._totals[heater_id]
+            totals[0] += 5
+            totals[1] += power // 10
+            totals[2] += flow
+        return {
+            "id": heater_id,
+            "busId": 1,
+            "name": "",
+            "connected": True,
+            "signal": -67,
+            "rssi": 0,
+            "lqi": 0,
+            "status": {
+                "setpoint": 450,
+                "tIn": 120,
+                "tOut": 450 if drawing else 200,
+                "tP1": 0,
+                "tP2": 0,
+                "tP3": 0,
+                "tP4": 0,
+                "flow": flow,
+                "flowMax": 254,
+                "valvePos": 71 if drawing else 0,
+                "valveFlags": 0,
+                "powerMax": POWER_MAX,
+                "power": power,
+                "power100": 0,
+                "fillingLeft": 0,
+                "flags": 1,
+                "sysFlags": 0,
+                "error": 0,
+            },
+        }
+
+    def _setup(self, heater_id):
+        return {
+            "id": heater_id,
+            "setup": {
+                "swVersion": "1.4.1",
+                "serialDevice": heater_id,
+                "serialPowerUnit": heater_id,
+                "flowMax": 254,
+                "loadShedding": 0,
+                "scaldProtection": 420,
+                "sound": 0,
+                "fcpAddr": 80,
+                "powerCosts": 30,
+                "powerMax": POWER_MAX,
+                "calValue": 2800,
+                "timerPowerOn": 300,
+                "timerLifetime": 172800,
+                "timerStandby": 2400,
+            },
+        }
+
+    def _logs(self, heater_id):
+        length, power, water = self._totals[heater_id]
+        return {
+            "id": heater_id,
+            "logs": [{"id": 1, "length": length, "power": power, "water": water}],
+        }
+
+    def _response(self, devices):
+        return {
+            "version": "1.4",
+            "error": 0,
+            "time": int(time.time()),
+            "success": True,
+            "cached": True,
+            "devices": devices,
+        }
+
+    async def handle(self, request):
+        """Answer a request after the latency or fail it"""
+        self.requests += 1
+        await asyncio.sleep(
+            max(0, self._latency + random.uniform(-self._jitter, self._jitter))
+        )
+        if random.random() < self._failure_rate:
+            self.failures += 1
+            raise web.HTTPInternalServerError()
+
+        path = request.path
+        heater_id = request.match_info.get("heater_id")
+        if heater_id is not None and heater_id not in self._ids:
+            raise web.HTTPNotFound()
+        if path == "/devices/status":
+            if not self._status_of_all_heaters:
+                raise web.HTTPNotFound()
+            body = self._response([self._status(heater) for heater in self._ids])
+        elif path.startswith("/devices/status/"):
+            body = self._response([self._status(heater_id)])
+        elif path.startswith("/devices/setup/"):
+            body = self._response([self._setup(heater_id)])
+        elif path == "/devices/logs":
+            body = self._response([self._logs(heater) for heater in self._ids])
+        elif path.startswith("/devices/logs/"):
+            body = self._response([self._logs(heater_id)])
+        elif path.startswith("/devices/setpoint/"):
+            body = self._response([self._status(heater_id)])
+        else:
+            raise web.HTTPNotFound()
+        return web.Response(text=json.dumps(body), content_type="application/json")
+
+    async def handle_stats(self, request):
+        """Return the request counters; not counted as a request itself"""
+        return web.json_response({"requests": self.requests, "failures": self.failures})
+
+
+def create_app(homeserver):
+    """Create the web application of a fake homeserver"""
+    app = web.Application()
+    app.router.add_get("/devices/status", homeserver.handle)
+    app.router.add_get("/devices/status/{heater_id}", homeserver.handle)
+    app.router.add_get("/devices/setup/{heater_id}", homeserver.handle)
+    app.router.add_get("/devices/logs", homeserver.handle)
+    app.router.add_get("/devices/logs/{heater_id}", homeserver.handle)
+    app.router.add_put("/devices/setpoint/{heater_id}", homeserver.handle)
+    app.router.add_get("/stats", homeserver.handle_stats)
+    return app
+
+
+async def async_serve(
+    homeservers,
+    heaters_per_homeserver,
+    first_port,
+    latency=0.0,
+    jitter=0.0,
+    failure_rate=0.0,
+    status_of_all_heaters=True,
+    started=None,
+):
+    """Serve the homeservers on consecutive ports until cancelled"""
+    runners = []
+    with tempfile.TemporaryDirectory() as directory:
+        ssl_context = create_ssl_context(directory)
+        try:
+            for homeserver in range(homeservers):
+                runner = web.AppRunner(
+                    create_app(
+                        FakeHomeserver(
+                            heater_ids(homeserver, heaters_per_homeserver),
+                            latency,
+                            jitter,
+                            failure_rate,
+                            status_of_all_heaters,
+                        )
+                    ),
+                    access_log=None,
+                )
+                await runner.setup()
+                runners.append(runner)
+                await web.TCPSite(
+                    runner,
+                    "127.0.0.1",
+                    first_port + homeserver,
+                    ssl_context=ssl_context,
+                ).start()
+            if started is not None:
+                started.set()
+            await asyncio.Event().wait()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+
+
+def serve(*args, **kwargs):
+    """Run the fake homeservers in their own event loop (and process)"""
+    try:
+        asyncio.run(async_serve(*args, **kwargs))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--homeservers", type=int, default=1)
+    parser.add_argument("--heaters-per-homeserver", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--latency", type=float, default=0.05, help="s")
+    parser.add_argument("--jitter", type=float, default=0.02, help="s")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--no-status-of-all-heaters",
+        dest="status_of_all_heaters",
+        action="store_false",
+        help="answer GET /devices/status with 404",
+    )
+    args = parser.parse_args()
+    print(
+        f"Serving {args.homeservers} homeservers on "
+        f"https://127.0.0.1:{args.port}-{args.port + args.homeservers - 1}"
+    )
+    serve(
+        args.homeservers,
+        args.heaters_per_homeserver,
+        args.port,
+        args.latency,
+        args.jitter,
+        args.failure_rate,
+        args.status_of_all_heaters,
+    )
+
+
+if __name__ == "__main__":
+    main()
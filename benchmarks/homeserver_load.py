@@ -0,0 +1,225 @@
+"""Benchmark of the polling of 1 to 200 heaters against fake homeservers.
+
+Starts the fake homeservers of fake_homeserver.py in a child process and
+polls them with the real clients, coordinators and sensors of the
+integration in a bare Home Assistant instance. For every number of heaters
+it reports the latency of a tick (one refresh of the coordinators of all
+hubs, which refresh the ones of their heaters), the requests and the state
+writes per tick and the CPU time of the polling process.
+
+Run from the root of the repository with Home Assistant installed:
+
+    python benchmarks/homeserver_load.py --heaters 1 10 50 200 --ticks 20
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from homeassistant.const import CONF_SCAN_INTERVAL  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from fake_homeserver import heater_ids, serve  # noqa: E402
+from custom_components.clage_homeserver import (  # noqa: E402
+    DEFAULT_POLLING_OPTIONS,
+    DEFAULT_REQUEST_TIMEOUT,
+    _async_create_coordinator,
+    _async_setup_data,
+    _create_client,
+)
+from custom_components.clage_homeserver.const import DOMAIN  # noqa: E402
+from custom_components.clage_homeserver.sensor import (  # noqa: E402
+    _create_sensors_for_homeserver,
+)
+
+HOMESERVER_ID = "F8F005DB0CD6"
+
+
+def percentile(values, percent):
+    """Return the percentile of the values (nearest rank)"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+async def async_create_hass(config_dir, max_concurrent_requests):
+    """Create a bare Home Assistant instance, that is never started"""
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        # Older versions take the config dir after the creation
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    _async_setup_data(hass, max_concurrent_requests, DEFAULT_REQUEST_TIMEOUT)
+    return hass
+
+
+def pass_scan_interval(hub_fetchers, scan_interval):
+    """Let a scan interval pass for the heaters, so they are due again"""
+    for hub_fetcher in hub_fetchers.values():
+        for homeserver_name in hub_fetcher._next_due:
+            hub_fetcher._next_due[homeserver_name] -= scan_interval.total_seconds()
+
+
+async def async_requests(session, ports):
+    """Return the number of requests all fake homeservers have answered"""
+    requests = 0
+    for port in ports:
+        async with session.get(f"https://127.0.0.1:{port}/stats", ssl=False) as stats:
+            requests += (await stats.json())["requests"]
+    return requests
+
+
+async def async_benchmark(heaters, args):
+    """Poll the given number of heaters and return the measured numbers"""
+    homeservers = math.ceil(heaters / args.heaters_per_homeserver)
+    ports = [args.port + homeserver for homeserver in range(homeservers)]
+
+    started = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve,
+        args=(homeservers, args.heaters_per_homeserver, args.port),
+        kwargs={
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "failure_rate": args.failure_rate,
+            "status_of_all_heaters": args.status_of_all_heaters,
+            "started": started,
+        },
+        daemon=True,
+    )
+    server.start()
+    await asyncio.get_running_loop().run_in_executor(None, started.wait)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_create_hass(config_dir, args.max_concurrent)
+        # The ticks are triggered by the benchmark, not by the interval
+        options = {**DEFAULT_POLLING_OPTIONS, CONF_SCAN_INTERVAL: timedelta(hours=1)}
+
+        writes = 0
+
+        def count_writes(write):
+            def counted_write():
+                nonlocal writes
+                writes += 1
+                write()
+
+            return counted_write
+
+        coordinators = []
+        hub_fetchers = hass.data[DOMAIN]["hub_fetchers"]
+        for heater in range(heaters):
+            homeserver = heater // args.heaters_per_homeserver
+            heater_id = heater_ids(homeserver, args.heaters_per_homeserver)[
+                heater % args.heaters_per_homeserver
+            ]
+            name = f"heater_{heater}"
+            ip_address = f"127.0.0.1:{args.port + homeserver}"
+            client = _create_client(hass, ip_address, HOMESERVER_ID, heater_id, options)
+            hass.data[DOMAIN]["api"][name] = client
+            coordinator = _async_create_coordinator(hass, name, client, options)
+            for entity in _create_sensors_for_homeserver(
+                name, ip_address, HOMESERVER_ID, heater_id, hass
+            ):
+                entity.hass = hass
+                entity.async_write_ha_state = count_writes(entity.async_write_ha_state)
+                coordinator.async_add_listener(entity._handle_coordinator_update)
+            coordinators.append(coordinator)
+
+        latencies = []
+        requests = []
+        state_writes = []
+        async with aiohttp.ClientSession() as session:
+            # The first tick also fetches the setup and consumption tiers
+            first_tick = time.perf_counter()
+            await asyncio.gather(
+                *(f.coordinator.async_refresh() for f in hub_fetchers.values())
+            )
+            first_tick = time.perf_counter() - first_tick
+
+            cpu_time = time.process_time()
+            for _ in range(args.ticks):
+                requests_before = await async_requests(session, ports)
+                writes_before = writes
+                pass_scan_interval(hub_fetchers, options[CONF_SCAN_INTERVAL])
+                tick = time.perf_counter()
+                await asyncio.gather(
+                    *(f.coordinator.async_refresh() for f in hub_fetchers.values())
+                )
+                latencies.append(time.perf_counter() - tick)
+                state_writes.append(writes - writes_before)
+                requests.append(await async_requests(session, ports) - requests_before)
+                await asyncio.sleep(args.pause)
+            cpu_time = time.process_time() - cpu_time
+
+        await asyncio.gather(
+            *(client.async_close() for client in hass.data[DOMAIN]["api"].values())
+        )
+        failed = sum(not c.last_update_success for c in coordinators)
+        await hass.async_stop(force=True)
+
+    server.terminate()
+    server.join()
+    return {
+        "heaters": heaters,
+        "first_tick": first_tick,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "requests": sum(requests) / len(requests),
+        "writes": sum(state_writes) / len(state_writes),
+        "cpu": cpu_time / args.ticks,
+        "failed": failed,
+    }
+
+
+async def async_main(args):
+    print(
+        f"{'heaters':>7} {'first':>8} {'p50':>8} {'p90':>8} {'p99':>8} "
+        f"{'req/tick':>8} {'writes/tick':>11} {'cpu/tick':>8} {'failed':>6}"
+    )
+    for heaters in args.heaters:
+        result = await async_benchmark(heaters, args)
+        print(
+            f"{result['heaters']:>7} "
+            f"{result['first_tick'] * 1000:>6.1f}ms "
+            f"{result['p50'] * 1000:>6.1f}ms "
+            f"{result['p90'] * 1000:>6.1f}ms "
+            f"{result['p99'] * 1000:>6.1f}ms "
+            f"{result['requests']:>8.1f} "
+            f"{result['writes']:>11.1f} "
+            f"{result['cpu'] * 1000:>6.1f}ms "
+            f"{result['failed']:>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--heaters", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--heaters-per-homeserver", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--pause", type=float, default=0.0, help="s between ticks")
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    parser.add_argument("--port", type=int, default=18443)
+    parser.add_argument("--latency", type=float, default=0.05, help="s")
+    parser.add_argument("--jitter", type=float, default=0.02, help="s")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--no-status-of-all-heaters",
+        dest="status_of_all_heaters",
+        action="store_false",
+        help="homeservers without GET /devices/status for all heaters",
+    )
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
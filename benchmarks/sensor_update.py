@@ -0,0 +1,115 @@
+"""Micro-benchmark of the per-update overhead of the sensor entities.
+
+Times the properties, that are read for every state write of a sensor, for
+all sensors of a number of heaters. The entities are compared with a variant,
+that computes the device info, the name and the unique id on every access,
+as the sensors did before.
+
+Run from the root of the repository with Home Assistant installed:
+
+    python benchmarks/sensor_update.py --heaters 10
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.clage_homeserver.const import DOMAIN  # noqa: E402
+from custom_components.clage_homeserver.sensor import (  # noqa: E402
+    ClageHomeserverSensor,
+    _sensors,
+)
+
+
+class PropertySensor(ClageHomeserverSensor):
+    """Sensor, that computes its static attributes on every access"""
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, self.homeservername)},
+            "name": self.homeservername,
+            "manufacturer": "CLAGE GmbH",
+            "model": f"DSX Touch {self.heater_id}@{self.homeserver_id}",
+            "configuration_url": f"https://{self.homeserver_ip_address}",
+        }
+
+    @property
+    def name(self):
+        return self._attr_name
+
+    @property
+    def unique_id(self):
+        return f"{self.homeservername}_{self._attribute}"
+
+    @property
+    def state(self):
+        return self.coordinator.data[self._attribute]
+
+
+def create_entities(sensor_class, heaters):
+    """Create the sensors of all heaters with a fake coordinator each"""
+    entities = []
+    for heater in range(heaters):
+        coordinator = SimpleNamespace(
+            data={definition.system_name: 0 for definition in _sensors},
+            last_update_success=True,
+        )
+        name = f"heater{heater}"
+        entities.extend(
+            sensor_class(
+                coordinator=coordinator,
+                entity_id=f"sensor.clagehomeserver_{name}_{definition.system_name}",
+                homeserver_name=name,
+                homeserver_ip_address="192.168.0.10",
+                homeserver_id="F8F005DB0CD6",
+                heater_id="2049DB0CD7",
+                name=definition.name,
+                attribute=definition.system_name,
+                unit=definition.unit,
+                state_class=definition.state_class,
+                device_class=definition.device_class,
+                entity_category=definition.entity_category,
+            )
+            for definition in _sensors
+        )
+    return entities
+
+
+def update(entities):
+    """Read what a state write reads from every entity"""
+    for entity in entities:
+        entity.name
+        entity.unique_id
+        entity.device_info
+        entity.state
+        entity.unit_of_measurement
+        entity._published_value()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--heaters", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    for sensor_class in (PropertySensor, ClageHomeserverSensor):
+        entities = create_entities(sensor_class, args.heaters)
+        best = min(
+            timeit.repeat(
+                lambda: update(entities), repeat=args.repeat, number=args.number
+            )
+        )
+        per_update = best / args.number / len(entities) * 1e9
+        print(
+            f"{sensor_class.__name__:>22}: {len(entities)} sensors, "
+            f"{per_update:.0f} ns per sensor update"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Benchmark of the import time and the setup wall time of the integration.
+
+The import time is measured in fresh interpreters, after the Home Assistant
+modules the integration uses have been imported, so it only contains the
+integration itself and the libraries it pulls in (requests is already
+imported by Home Assistant, so the import of clage_homeserver is what
+counts). The setup wall time is
+the time async_setup takes to set up homeservers from the YAML
+configuration against the fake homeservers of fake_homeserver.py, whose
+latency stands for slow or unreachable homeservers. The time until the
+sensor platform has added the entities of all homeservers and the time
+until their first states are fetched are reported as well. The bare
+instance loads the base functionality (registries and translation cache)
+like Home Assistant does before it sets up integrations.
+
+Run from the root of the repository with Home Assistant installed, once on
+the revision to compare with and once on the current one:
+
+    python benchmarks/startup.py --homeservers 1 10 --latency 1
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.const import CONF_NAME  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+# The loader and bootstrap can only be imported after the core
+from homeassistant import bootstrap, config_entries, loader  # noqa: E402,I001
+
+from fake_homeserver import heater_ids, serve  # noqa: E402
+
+HOMESERVER_ID = "F8F005DB0CD6"
+# Longer than any setup against the fake homeservers should take
+MAX_WAIT = 120
+
+IMPORT_SCRIPT = """
+import sys
+import time
+
+import aiohttp
+import homeassistant.components.sensor
+import homeassistant.helpers.config_validation
+import homeassistant.helpers.update_coordinator
+
+started = time.perf_counter()
+import custom_components.clage_homeserver
+print(time.perf_counter() - started, "clage_homeserver" in sys.modules)
+"""
+
+
+def measure_import(runs):
+    """Return the median import time in s and whether the library was imported"""
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        times.append(float(output[0]))
+    return statistics.median(times), output[1] == "True"
+
+
+async def async_wait_until(condition):
+    """Wait until the condition is true, failing after MAX_WAIT seconds"""
+    async with asyncio.timeout(MAX_WAIT):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def async_measure_setup(homeservers, args):
+    """Return the wall time of async_setup, until the sensors and the first states"""
+    # Imported here, so the import time above is measured without it
+    from custom_components.clage_homeserver import async_setup
+    from custom_components.clage_homeserver.const import (
+        CONF_HEATER_ID,
+        CONF_HOMESERVER_ID,
+        CONF_HOMESERVER_IP_ADDRESS,
+        CONF_HOMESERVERS,
+        DOMAIN,
+    )
+
+    started = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve,
+        args=(homeservers, 1, args.port),
+        kwargs={"latency": args.latency, "jitter": 0.0, "started": started},
+        daemon=True,
+    )
+    server.start()
+    await asyncio.get_running_loop().run_in_executor(None, started.wait)
+
+    # The shape of the YAML configuration after the CONFIG_SCHEMA, which
+    # does not accept the ports of the fake homeservers
+    config = {
+        DOMAIN: {
+            CONF_HOMESERVERS: [
+                [
+                    {
+                        CONF_NAME: f"homeserver_{homeserver}",
+                        CONF_HOMESERVER_IP_ADDRESS: (
+                            f"127.0.0.1:{args.port + homeserver}"
+                        ),
+                        CONF_HOMESERVER_ID: HOMESERVER_ID,
+                        CONF_HEATER_ID: heater_ids(homeserver, 1)[0],
+                    }
+                ]
+                for homeserver in range(homeservers)
+            ]
+        }
+    }
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        try:
+            hass = HomeAssistant(config_dir)
+        except TypeError:
+            # Older versions take the config dir after the creation
+            hass = HomeAssistant()
+            hass.config.config_dir = config_dir
+        loader.async_setup(hass)
+        hass.config_entries = config_entries.ConfigEntries(hass, config)
+        await bootstrap.async_load_base_functionality(hass)
+
+        started = time.perf_counter()
+        await async_setup(hass, config)
+        setup = time.perf_counter() - started
+        # Like async_setup_component; otherwise loading the sensor platform
+        # would set up the integration a second time.
+        hass.config.components.add(DOMAIN)
+        # The platform is only marked as loaded after all entities are added
+        await async_wait_until(lambda: f"{DOMAIN}.sensor" in hass.config.components)
+        sensors = time.perf_counter() - started
+        # The first refresh tracks the startup time of every homeserver
+        await async_wait_until(
+            lambda: len(hass.data[DOMAIN]["startup_times"]) >= homeservers
+        )
+        first_states = time.perf_counter() - started
+
+        await asyncio.gather(
+            *(client.async_close() for client in hass.data[DOMAIN]["api"].values())
+        )
+        await hass.async_stop(force=True)
+
+    server.terminate()
+    server.join()
+    return setup, sensors, first_states
+
+
+async def async_main(args):
+    import_time, library_imported = measure_import(args.runs)
+    print(
+        f"import: {import_time * 1000:.1f}ms (median of {args.runs} runs), "
+        f"clage_homeserver imported: {library_imported}"
+    )
+    print(f"{'homeservers':>11} {'setup':>9} {'sensors':>9} {'first states':>12}")
+    for homeservers in args.homeservers:
+        setup, sensors, first_states = await async_measure_setup(homeservers, args)
+        print(
+            f"{homeservers:>11} {setup * 1000:>7.1f}ms {sensors * 1000:>7.1f}ms "
+            f"{first_states * 1000:>10.1f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--homeservers", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--runs", type=int, default=10, help="of the import")
+    parser.add_argument("--port", type=int, default=18443)
+    parser.add_argument("--latency", type=float, default=1.0, help="s")
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
 """clage_homeserver integration"""
+import asyncio
 import voluptuous as vol
 import ipaddress
 import logging
+import time
+from contextlib import ExitStack
 from datetime import timedelta
 import homeassistant.helpers.config_validation as cv
-from homeassistant.const import CONF_HOST, CONF_SCAN_INTERVAL
-from homeassistant.core import valid_entity_id
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_HOST,
+    CONF_SCAN_INTERVAL,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import SupportsResponse, valid_entity_id
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant import core
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.discovery import async_load_platform
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+import homeassistant.util.dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -19,18 +35,137 @@ from .const import (
     CONF_HOMESERVER_ID,
     CONF_HEATER_ID,
     HOMESERVER_API,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_REQUEST_TIMEOUT,
+    CONF_SETUP_SCAN_INTERVAL,
+    CONF_CONSUMPTION_SCAN_INTERVAL,
+    DEFAULT_SETUP_UPDATE_INTERVAL,
+    DEFAULT_CONSUMPTION_UPDATE_INTERVAL,
+    CONF_INCREMENTAL_CONSUMPTION,
+    CONF_LOCAL_CONSUMPTION,
+    CONF_ADAPTIVE_POLLING,
+    CONF_IDLE_SCAN_INTERVAL,
+    DEFAULT_IDLE_UPDATE_INTERVAL,
+    CONF_SENSOR_GROUPS,
+    SENSOR_GROUP_ENERGY,
+    SENSOR_GROUP_SETUP,
+    SENSOR_GROUPS,
+    SIGNAL_POLLED,
 )
 
-from clage_homeserver import ClageHomeServer
+from .api import (
+    ClageHomeServerClient,
+    ClageHomeServerError,
+    ClageHomeServerHub,
+    async_import_library,
+    create_session,
+)
+from .circuit_breaker import STATE_CLOSED, CircuitBreaker
+from .consumption import (
+    IncrementalConsumption,
+    LocalConsumption,
+    async_remove_consumption,
+)
+from .decoding import StateDecoder
+from .draws import DrawDetector, EVENT_DRAW_FINISHED
+from .history import SampleHistory
+from .metrics import (
+    ENDPOINT_CONSUMPTION_LOG,
+    ENDPOINT_CONSUMPTION_TOTALS,
+    ENDPOINT_SET_TEMPERATURE,
+    ENDPOINT_SETUP,
+    ENDPOINT_STATUS,
+    RequestMetrics,
+)
+from .profiler import TickProfiler
+from .snapshot import STALE, StateSnapshot, async_remove_snapshot
 
 _LOGGER = logging.getLogger(__name__)
 
 SERVICE_HOMESERVE_NAME_ATTRIBUTE = "homeserver_name"
 SERVICE_HEATER_ID_ATTRIBUTE = "heater_id"
 SERVICE_HEATER_TEMPERATURE = "temperature"
+SERVICE_TARGETS_ATTRIBUTE = "targets"
+SERVICE_FORCE_ATTRIBUTE = "force"
+SERVICE_START_ATTRIBUTE = "start"
+SERVICE_END_ATTRIBUTE = "end"
+SERVICE_TICKS_ATTRIBUTE = "ticks"
 
 MIN_UPDATE_INTERVAL = timedelta(seconds=10)
 DEFAULT_UPDATE_INTERVAL = timedelta(seconds=20)
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+DEFAULT_REQUEST_TIMEOUT = timedelta(seconds=15)
+ACTIVE_UPDATE_INTERVAL = timedelta(seconds=5)
+IDLE_BACKOFF_FACTOR = 1.5
+KEEPALIVE_FACTOR = 2
+REQUEST_REFRESH_COOLDOWN = 3
+DUE_TOLERANCE = timedelta(seconds=1)
+DEFAULT_PROFILE_TICKS = 5
+MAX_PROFILE_TICKS = 100
+
+# The states with the summary of the last draw by the keys of the draw
+LAST_DRAW_FIELDS = {
+    "duration": "last_draw_duration",
+    "water": "last_draw_water",
+    "energy": "last_draw_energy",
+    "costs": "last_draw_costs",
+}
+
+TIER_SETUP = "setup"
+TIER_CONSUMPTION = "consumption"
+
+# The sensor group, that needs the payload of a tier
+TIER_SENSOR_GROUPS = {
+    TIER_SETUP: SENSOR_GROUP_SETUP,
+    TIER_CONSUMPTION: SENSOR_GROUP_ENERGY,
+}
+
+DEFAULT_POLLING_OPTIONS = {
+    CONF_SCAN_INTERVAL: DEFAULT_UPDATE_INTERVAL,
+    CONF_SETUP_SCAN_INTERVAL: DEFAULT_SETUP_UPDATE_INTERVAL,
+    CONF_CONSUMPTION_SCAN_INTERVAL: DEFAULT_CONSUMPTION_UPDATE_INTERVAL,
+    CONF_INCREMENTAL_CONSUMPTION: False,
+    CONF_LOCAL_CONSUMPTION: False,
+    CONF_ADAPTIVE_POLLING: False,
+    CONF_IDLE_SCAN_INTERVAL: DEFAULT_IDLE_UPDATE_INTERVAL,
+    CONF_SENSOR_GROUPS: SENSOR_GROUPS,
+}
+
+SET_TEMPERATURE_MANY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(SERVICE_TARGETS_ATTRIBUTE, default=[]): [
+            {
+                vol.Required(SERVICE_HOMESERVE_NAME_ATTRIBUTE): cv.string,
+                vol.Optional(SERVICE_HEATER_ID_ATTRIBUTE): cv.string,
+                vol.Required(SERVICE_HEATER_TEMPERATURE): vol.Any(
+                    vol.Coerce(int), cv.entity_id
+                ),
+            }
+        ],
+        vol.Optional(ATTR_ENTITY_ID, default=[]): cv.entity_ids,
+        vol.Optional(SERVICE_HEATER_TEMPERATURE): vol.Any(
+            vol.Coerce(int), cv.entity_id
+        ),
+        vol.Optional(SERVICE_FORCE_ATTRIBUTE, default=False): cv.boolean,
+    }
+)
+
+GET_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(SERVICE_HOMESERVE_NAME_ATTRIBUTE): cv.string,
+        vol.Optional(SERVICE_START_ATTRIBUTE): cv.datetime,
+        vol.Optional(SERVICE_END_ATTRIBUTE): cv.datetime,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(SERVICE_HOMESERVE_NAME_ATTRIBUTE): cv.string,
+        vol.Optional(SERVICE_TICKS_ATTRIBUTE, default=DEFAULT_PROFILE_TICKS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_PROFILE_TICKS)
+        ),
+    }
+)
 
 CONFIG_SCHEMA = vol.Schema(
     {
@@ -58,6 +193,29 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Optional(
                     CONF_SCAN_INTERVAL, default=DEFAULT_UPDATE_INTERVAL
                 ): vol.All(cv.time_period, vol.Clamp(min=MIN_UPDATE_INTERVAL)),
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_REQUESTS,
+                    default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional(
+                    CONF_REQUEST_TIMEOUT, default=DEFAULT_REQUEST_TIMEOUT
+                ): cv.time_period,
+                vol.Optional(
+                    CONF_SETUP_SCAN_INTERVAL, default=DEFAULT_SETUP_UPDATE_INTERVAL
+                ): vol.All(cv.time_period, vol.Clamp(min=MIN_UPDATE_INTERVAL)),
+                vol.Optional(
+                    CONF_CONSUMPTION_SCAN_INTERVAL,
+                    default=DEFAULT_CONSUMPTION_UPDATE_INTERVAL,
+                ): vol.All(cv.time_period, vol.Clamp(min=MIN_UPDATE_INTERVAL)),
+                vol.Optional(CONF_INCREMENTAL_CONSUMPTION, default=False): cv.boolean,
+                vol.Optional(CONF_LOCAL_CONSUMPTION, default=False): cv.boolean,
+                vol.Optional(CONF_ADAPTIVE_POLLING, default=False): cv.boolean,
+                vol.Optional(
+                    CONF_IDLE_SCAN_INTERVAL, default=DEFAULT_IDLE_UPDATE_INTERVAL
+                ): vol.All(cv.time_period, vol.Clamp(min=MIN_UPDATE_INTERVAL)),
+                vol.Optional(CONF_SENSOR_GROUPS, default=SENSOR_GROUPS): vol.All(
+                    cv.ensure_list, [vol.In(SENSOR_GROUPS)]
+                ),
             }
         )
     },
@@ -72,14 +230,29 @@ async def async_setup_entry(hass, config):
     _LOGGER.debug(repr(config.data))
 
     name = config.data[CONF_NAME]
-    clage_homeserver = ClageHomeServer(
+    options = _entry_options(config.data)
+    await async_import_library(hass)
+    clage_homeserver = _create_client(
+        hass,
         config.data[CONF_HOMESERVER_IP_ADDRESS],
         config.data[CONF_HOMESERVER_ID],
         config.data[CONF_HEATER_ID],
+        options,
     )
     hass.data[DOMAIN]["api"][name] = clage_homeserver
 
-    await hass.data[DOMAIN]["coordinator"].async_refresh()
+    coordinator = _async_create_coordinator(hass, name, clage_homeserver, options)
+
+    # The sensors start with the states of the last run; the first poll
+    # runs in the background and does not delay the setup.
+    await _async_restore_snapshot(hass, name, coordinator)
+    hass.async_create_task(
+        _async_first_refresh(
+            hass,
+            hass.data[DOMAIN]["hub_fetchers"][clage_homeserver.ip_address],
+            [name],
+        )
+    )
 
     # device_registry = dr.async_get(hass)
 
@@ -101,121 +274,795 @@ async def async_setup_entry(hass, config):
 async def async_unload_entry(hass, entry):
     """Unload the integration clage_homeserver from HOME ASSISTANT"""
 
-    _LOGGER.info("Unloading homeserver %s", entry.data[CONF_NAME])
-    hass.data[DOMAIN]["api"].pop(entry.data[CONF_NAME])
+    name = entry.data[CONF_NAME]
+    _LOGGER.info("Unloading homeserver %s", name)
+    # The sensors keep the coordinator scheduled, so they go first and the
+    # session is only closed, when nothing polls the homeserver any longer.
+    if not await hass.config_entries.async_forward_entry_unload(entry, "sensor"):
+        return False
+    await hass.data[DOMAIN]["coordinators"].pop(name).async_shutdown()
+
+    clage_homeserver = hass.data[DOMAIN]["api"].pop(name)
+    hub_fetcher = hass.data[DOMAIN]["hub_fetchers"][clage_homeserver.ip_address]
+    # A delayed save must not write the stores after they have been removed
+    await hub_fetcher.heaters[name].async_flush()
+    hub_fetcher.async_remove_heater(name)
+    if not hub_fetcher.heaters:
+        hass.data[DOMAIN]["hub_fetchers"].pop(clage_homeserver.ip_address)
+        await hub_fetcher.coordinator.async_shutdown()
+    hass.data[DOMAIN]["circuit_breakers"].pop(name)
+    hass.data[DOMAIN]["decoders"].pop(name)
+    hass.data[DOMAIN]["histories"].pop(name)
+    hass.data[DOMAIN]["request_metrics"].pop(name)
+    hass.data[DOMAIN]["snapshots"].pop(name)
+    hass.data[DOMAIN]["skipped_state_writes"].pop(name, None)
+    hass.data[DOMAIN]["suppressed_writes"].pop(name, None)
+    hass.data[DOMAIN]["startup_times"].pop(name, None)
+    await clage_homeserver.async_close()
     return True
 
 
+async def async_remove_entry(hass, entry):
+    """Remove the stored states and consumption of a removed homeserver"""
+
+    name = entry.data[CONF_NAME]
+    # A new homeserver with the same name must not restore them
+    await asyncio.gather(
+        async_remove_snapshot(hass, name), async_remove_consumption(hass, name)
+    )
+
+
 class HomeserverStateFetcher:
-    """Class to manage the states of the homeserver and heater"""
+    """Class to manage the states of a homeserver and its heater"""
 
-    def __init__(self, hass):
+    def __init__(
+        self,
+        hass,
+        homeserver_name,
+        homeserver,
+        semaphore,
+        request_timeout=DEFAULT_REQUEST_TIMEOUT,
+        options=DEFAULT_POLLING_OPTIONS,
+        circuit_breaker=None,
+        decoder=None,
+        history=None,
+        request_metrics=None,
+        snapshot=None,
+    ):
         self._hass = hass
+        self._homeserver_name = homeserver_name
+        self._homeserver = homeserver
+        self._semaphore = semaphore
+        self._request_timeout = request_timeout
+        self._scan_interval = options[CONF_SCAN_INTERVAL]
+        # The interval, that the heater asks the coordinator of its hub for
+        self.update_interval = self._scan_interval
+        self._idle_interval = (
+            options[CONF_IDLE_SCAN_INTERVAL] if options[CONF_ADAPTIVE_POLLING] else None
+        )
+        self._tier_intervals = {
+            TIER_SETUP: options[CONF_SETUP_SCAN_INTERVAL],
+            TIER_CONSUMPTION: options[CONF_CONSUMPTION_SCAN_INTERVAL],
+        }
+        self._last_tier_fetch = {}
+        # A payload, that no enabled sensor needs, is never fetched
+        self._tiers = {
+            tier
+            for tier, sensor_group in TIER_SENSOR_GROUPS.items()
+            if sensor_group in options[CONF_SENSOR_GROUPS]
+        }
+        self._consumption = (
+            IncrementalConsumption(hass, homeserver_name)
+            if options[CONF_INCREMENTAL_CONSUMPTION]
+            else None
+        )
+        self._local_consumption = (
+            LocalConsumption(homeserver_name)
+            if options[CONF_LOCAL_CONSUMPTION] and TIER_CONSUMPTION in self._tiers
+            else None
+        )
+        self._circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._polling_interval = self._scan_interval
+        self._decoder = decoder or StateDecoder(homeserver_name)
+        self._history = history or SampleHistory()
+        self._request_metrics = request_metrics or RequestMetrics()
+        self._snapshot = snapshot or StateSnapshot(hass, homeserver_name)
+        self._draws = DrawDetector()
+        # The raw status (or the error) of the last poll of the hub
+        self.polled_status = None
+        self.coordinator = None
 
-    async def fetch_states(self):
-        """Fetch the actual states from the homeserver"""
+    @property
+    def heater_id(self):
+        """Return the id of the heater"""
+        return self._homeserver.heater_id
+
+    @property
+    def circuit_open(self):
+        """Return True while the circuit breaker of the heater is not closed"""
+        return self._circuit_breaker.state != STATE_CLOSED
+
+    async def async_flush(self):
+        """Write the delayed saves of the snapshot and the consumption"""
+        await self._snapshot.async_flush()
+        if self._consumption is not None:
+            await self._consumption.async_flush()
 
-        _LOGGER.debug("Updating the states")
-        homeservers = self._hass.data[DOMAIN]["api"]
-        data = self.coordinator.data if self.coordinator.data else {}
-        for homeserver_id in homeservers.keys():
-            homeserver = homeservers[homeserver_id]
+    def measure_polled_status(self):
+        """Measure the status request of the hub for this heater"""
+        return self._request_metrics.measure(ENDPOINT_STATUS)
 
+    def _tier_is_due(self, tier, now):
+        """Return True if the given tier of the homeserver has to be fetched"""
+        if tier not in self._tiers:
+            return False
+        last_fetch = self._last_tier_fetch.get(tier)
+        if last_fetch is None:
+            return True
+        return now - last_fetch >= self._tier_intervals[tier].total_seconds()
+
+    def _adapt_update_interval(self, states):
+        """Poll fast while water is drawn and back off gradually when idle"""
+        if self._idle_interval is None:
+            return
+
+        update_interval = self.update_interval
+        if (states.get("heater_status_flow") or 0) > 0 or (
+            states.get("heater_status_power") or 0
+        ) > 0:
+            update_interval = ACTIVE_UPDATE_INTERVAL
+        elif update_interval < self._scan_interval:
+            update_interval = self._scan_interval
+        else:
+            update_interval = min(
+                update_interval * IDLE_BACKOFF_FACTOR, self._idle_interval
+            )
+
+        if update_interval != self.update_interval:
             _LOGGER.debug(
-                "Fetch the states (status) from the CLAGE Homeserver '%s' und update them in Home Assistant",
-                homeserver_id,
+                "Poll the CLAGE Homeserver '%s' every %s",
+                self._homeserver_name,
+                update_interval,
+            )
+            self.update_interval = update_interval
+
+    def _detect_draw(self, now, states):
+        """Fire the events of a started or finished draw and publish its summary"""
+        detected = self._draws.add(now, states)
+        for key, field in LAST_DRAW_FIELDS.items():
+            if detected is not None and detected[0] == EVENT_DRAW_FINISHED:
+                states[field] = detected[1][key]
+            else:
+                # The summary is unknown until the first draw has finished
+                states.setdefault(field, None)
+        if detected is None:
+            return
+
+        event_type, draw = detected
+        _LOGGER.debug(
+            "Draw of the CLAGE Homeserver '%s': %s %s",
+            self._homeserver_name,
+            event_type,
+            draw,
+        )
+        event_data = {
+            SERVICE_HOMESERVE_NAME_ATTRIBUTE: self._homeserver_name,
+            SERVICE_HEATER_ID_ATTRIBUTE: self._homeserver.heater_id,
+            **draw,
+        }
+        for key in ("start", "end"):
+            if key in event_data:
+                event_data[key] = dt_util.utc_from_timestamp(
+                    event_data[key]
+                ).isoformat()
+        self._hass.bus.async_fire(event_type, event_data)
+
+    def _record_success(self):
+        """Close the circuit breaker and go back to the normal interval"""
+        if self._circuit_breaker.record_success():
+            _LOGGER.info(
+                "CLAGE Homeserver '%s' is reachable again", self._homeserver_name
+            )
+            self.update_interval = self._scan_interval
+        async_dispatcher_send(self._hass, SIGNAL_POLLED.format(self._homeserver_name))
+
+    def _record_failure(self):
+        """Count the failure and back off, if the circuit breaker opened"""
+        if self._circuit_breaker.state == STATE_CLOSED:
+            # The interval, that the backoff must not undercut
+            self._polling_interval = self.update_interval
+        retry_in = self._circuit_breaker.record_failure(self._polling_interval)
+        # The coordinator does not notify its listeners about a failure after
+        # a failure, so the diagnostic sensors are updated by the signal.
+        async_dispatcher_send(self._hass, SIGNAL_POLLED.format(self._homeserver_name))
+        if retry_in is not None:
+            _LOGGER.warning(
+                "CLAGE Homeserver '%s' failed %s times in a row, retry in %s",
+                self._homeserver_name,
+                self._circuit_breaker.consecutive_failures,
+                retry_in,
             )
-            fetched_states = dict(
-                await self._hass.async_add_executor_job(homeserver.requestStatus)
+            self.update_interval = retry_in
+
+    async def _fetch_consumption(self):
+        """Fetch the consumption totals, from the log if it is aggregated"""
+        homeserver = self._homeserver
+        if self._consumption is not None:
+            await self._consumption.async_load()
+            with self._request_metrics.measure(ENDPOINT_CONSUMPTION_LOG):
+                consumption_log = await homeserver.async_get_consumption_log()
+            return self._consumption.add_entries(consumption_log)
+        with self._request_metrics.measure(ENDPOINT_CONSUMPTION_TOTALS):
+            return await homeserver.async_get_consumption_totals()
+
+    def _log_tier_failure(self, tier, err):
+        _LOGGER.warning(
+            "Could not fetch the %s of the CLAGE Homeserver '%s', retry in %s: %s",
+            tier,
+            self._homeserver_name,
+            self._tier_intervals[tier],
+            err,
+        )
+
+    async def _fetch_homeserver_states(self, previous_states, polled_status):
+        """Fetch the due polling tiers of the homeserver"""
+
+        homeserver = self._homeserver
+        now = time.monotonic()
+
+        # The values of the setup and consumption tiers are kept from the
+        # previous tick until their own interval is over.
+        fetched_states = dict(previous_states)
+        # The restored states of the last run are not stale any longer
+        fetched_states.pop(STALE, None)
+
+        _LOGGER.debug(
+            "Fetch the states (status) from the CLAGE Homeserver '%s' und update them in Home Assistant",
+            self._homeserver_name,
+        )
+        if polled_status is None:
+            with self._request_metrics.measure(ENDPOINT_STATUS):
+                status = await homeserver.async_request_status()
+        else:
+            status = await homeserver.async_request_status(polled_status)
+        fetched_states.update(self._decoder.decode(status))
+        if self._local_consumption is not None:
+            fetched_states.update(
+                self._local_consumption.add_sample(now, fetched_states)
             )
 
+        # A failed tier keeps its previous values and the fresh status; it
+        # is retried after its own interval, not on the next tick.
+        if self._tier_is_due(TIER_SETUP, now):
             _LOGGER.debug(
                 "Fetch the states (setup) from the CLAGE Homeserver '%s' und update them in Home Assistant",
-                homeserver_id,
-            )
-            fetched_states.update(
-                await self._hass.async_add_executor_job(homeserver.requestSetup)
+                self._homeserver_name,
             )
+            self._last_tier_fetch[TIER_SETUP] = now
+            try:
+                with self._request_metrics.measure(ENDPOINT_SETUP):
+                    setup = await homeserver.async_request_setup()
+            except ClageHomeServerError as err:
+                self._log_tier_failure(TIER_SETUP, err)
+            else:
+                fetched_states.update(self._decoder.decode(setup))
 
+        if self._tier_is_due(TIER_CONSUMPTION, now):
             _LOGGER.debug(
                 "Fetch the consumption logs from the CLAGE Homeserver '%s' und update them in Home Assistant",
-                homeserver_id,
-            )
-            fetched_states.update(
-                await self._hass.async_add_executor_job(homeserver.GetConsumptionTotals)
+                self._homeserver_name,
             )
+            self._last_tier_fetch[TIER_CONSUMPTION] = now
+            try:
+                consumption = await self._fetch_consumption()
+            except ClageHomeServerError as err:
+                self._log_tier_failure(TIER_CONSUMPTION, err)
+            else:
+                consumption = self._decoder.decode(consumption)
+                fetched_states.update(consumption)
+                if self._local_consumption is not None:
+                    fetched_states.update(self._local_consumption.sync(consumption))
 
-            data[homeserver_id] = fetched_states
-        return data
+        if self._local_consumption is not None:
+            # The drift is only known after the first sync
+            fetched_states.setdefault("consumption_energy_drift", None)
+            fetched_states.setdefault("consumption_water_drift", None)
 
+        return fetched_states
 
-async def async_setup(hass: core.HomeAssistant, config: dict) -> bool:
-    """Set up clage_homeserver platforms and services."""
+    async def fetch_states(self):
+        """Fetch the actual states from the homeserver"""
+        try:
+            return await self._fetch_states()
+        finally:
+            # A running profile counts every finished poll, also a failed one
+            profiler = self._hass.data[DOMAIN]["profiler"]
+            if profiler is not None:
+                profiler.async_tick_finished(self._homeserver_name)
 
-    _LOGGER.debug("clage_homeserver: async_setup")
-    scan_interval = DEFAULT_UPDATE_INTERVAL
+    async def _fetch_states(self):
+        _LOGGER.debug("Updating the states of '%s'", self._homeserver_name)
+        previous_states = self.coordinator.data if self.coordinator.data else {}
+        # Without a polled status (a refresh after a write) the heater
+        # requests its own status.
+        polled_status, self.polled_status = self.polled_status, None
 
-    hass.data[DOMAIN] = {}
-    homeserver_api = {}
-    homeservers = []
-    if DOMAIN in config:
-        scan_interval = config[DOMAIN].get(CONF_SCAN_INTERVAL, DEFAULT_UPDATE_INTERVAL)
+        # Every heater has its own coordinator and they poll in parallel;
+        # the semaphore shared by all of them limits the concurrent requests.
+        self._circuit_breaker.attempt()
+        try:
+            if isinstance(polled_status, Exception):
+                raise polled_status
+            async with self._semaphore:
+                fetched_states = await asyncio.wait_for(
+                    self._fetch_homeserver_states(previous_states, polled_status),
+                    self._request_timeout.total_seconds(),
+                )
+        except asyncio.TimeoutError as err:
+            self._record_failure()
+            raise UpdateFailed(
+                f"Timeout while fetching the states from the CLAGE Homeserver '{self._homeserver_name}'"
+            ) from err
+        except ClageHomeServerError as err:
+            self._record_failure()
+            raise UpdateFailed(
+                f"Error while fetching the states from the CLAGE Homeserver '{self._homeserver_name}': {err}"
+            ) from err
 
-        homeservers = config[DOMAIN].get(CONF_HOMESERVERS, [])
+        self._record_success()
+        now = time.time()
+        self._history.add(now, fetched_states)
+        self._detect_draw(now, fetched_states)
+        self._snapshot.save(fetched_states)
+        self._adapt_update_interval(fetched_states)
+        return fetched_states
+
+
+@core.callback
+def _async_hub_polled():
+    """Keep the coordinator of a hub scheduled; it has no entities"""
+
+
+class HubStatusFetcher:
+    """Poll the status of all heaters behind a homeserver in one request.
+
+    Only the coordinator of the hub is scheduled. Every tick it requests the
+    status of the heaters, that are due, at once and refreshes their
+    coordinators with it, which add their own tiers. A heater is due after
+    its own update interval, which is the backoff of its circuit breaker
+    while the circuit is open, so a dead heater is not polled with the
+    others. The hub ticks when the next heater is due.
+    """
+
+    def __init__(self, hub, semaphore, request_timeout):
+        self._hub = hub
+        self._semaphore = semaphore
+        self._request_timeout = request_timeout
+        self._remove_listeners = {}
+        # The monotonic time, when a heater has to be polled next
+        self._next_due = {}
+        self.heaters = {}
+        self.coordinator = None
+
+    @core.callback
+    def async_add_heater(self, homeserver_name, heater):
+        """Poll the status of a heater with the other heaters of the hub"""
+        self.heaters[homeserver_name] = heater
+        self._next_due[homeserver_name] = time.monotonic()
+        self._remove_listeners[homeserver_name] = self.coordinator.async_add_listener(
+            _async_hub_polled
+        )
+        self._update_interval(time.monotonic())
+
+    @core.callback
+    def async_remove_heater(self, homeserver_name):
+        """Stop polling the status of a heater"""
+        self.heaters.pop(homeserver_name)
+        self._next_due.pop(homeserver_name)
+        self._remove_listeners.pop(homeserver_name)()
+        if self.heaters:
+            self._update_interval(time.monotonic())
+
+    def _update_interval(self, now):
+        """Tick again, when the next heater is due"""
+        self.coordinator.update_interval = max(
+            timedelta(seconds=min(self._next_due.values()) - now), DUE_TOLERANCE
+        )
+
+    async def _async_request_statuses(self, heaters):
+        """Return the raw status or the error of the request by heater id"""
+        # A single heater is requested on its own, like by the library
+        if len(heaters) < 2 or not self._hub.status_of_all_heaters:
+            return {}
+        try:
+            with ExitStack() as measures:
+                for heater in heaters:
+                    measures.enter_context(heater.measure_polled_status())
+                async with self._semaphore:
+                    return await asyncio.wait_for(
+                        self._hub.async_request_statuses(),
+                        self._request_timeout.total_seconds(),
+                    )
+        except (asyncio.TimeoutError, ClageHomeServerError) as err:
+            # All heaters fail with the request for all of them
+            return {heater.heater_id: err for heater in heaters}
+
+    async def fetch_statuses(self):
+        """Poll the status of the due heaters and refresh their coordinators"""
+        # The coordinator may tick up to a second early
+        due = time.monotonic() + DUE_TOLERANCE.total_seconds()
+        heaters = {
+            homeserver_name: heater
+            for homeserver_name, heater in self.heaters.items()
+            if self._next_due[homeserver_name] <= due
+        }
+        statuses = await self._async_request_statuses(list(heaters.values()))
+        for heater in heaters.values():
+            status = statuses.get(heater.heater_id)
+            if status is None and statuses and heater.circuit_open:
+                # The heater is missing in the status of the hub; an open
+                # circuit is not retried with a request of its own.
+                status = ClageHomeServerError(
+                    f"No status of heater {heater.heater_id} in the status of all heaters"
+                )
+            heater.polled_status = status
+        await asyncio.gather(
+            *(heater.coordinator.async_refresh() for heater in heaters.values())
+        )
+
+        now = time.monotonic()
+        for homeserver_name, heater in heaters.items():
+            if homeserver_name in self._next_due:
+                # The update interval of the heater is adapted by its poll
+                self._next_due[homeserver_name] = (
+                    now + heater.update_interval.total_seconds()
+                )
+        if self.heaters:
+            self._update_interval(now)
+
+
+def _entry_options(data):
+    """Return the polling options of a config entry, that stores seconds"""
+    options = dict(DEFAULT_POLLING_OPTIONS)
+    for key, default in DEFAULT_POLLING_OPTIONS.items():
+        if key in data:
+            if isinstance(default, timedelta):
+                options[key] = timedelta(seconds=data[key])
+            else:
+                options[key] = data[key]
+    return options
 
-        for homeserver in homeservers:
-            homeserver_name = homeserver[0][CONF_NAME]
-            ip_address = homeserver[0][CONF_HOMESERVER_IP_ADDRESS]
-            homeserver_id = homeserver[0][CONF_HOMESERVER_ID]
-            heater_id = homeserver[0][CONF_HEATER_ID]
-            _LOGGER.info(
-                "Setup: ip_address: '%s', homeserver_id: '%s', heater_id: '%s'",
-                ip_address,
-                homeserver_id,
-                heater_id,
-            )
-            clage_home_server = ClageHomeServer(ip_address, homeserver_id, heater_id)
-            homeserver_api[homeserver_name] = clage_home_server
 
-    hass.data[DOMAIN]["api"] = homeserver_api
+def _create_client(hass, ip_address, homeserver_id, heater_id, options):
+    """Create the client of a heater on the hub of its homeserver.
+
+    All heaters behind the same homeserver share one hub, so they share its
+    keep-alive session and a single status request for all of them (see
+    HubStatusFetcher).
+    """
+    hubs = hass.data[DOMAIN]["hubs"]
+    hub = hubs.get(ip_address)
+    if hub is None or hub.closed:
+        longest_interval = options[CONF_SCAN_INTERVAL]
+        if options[CONF_ADAPTIVE_POLLING]:
+            longest_interval = max(longest_interval, options[CONF_IDLE_SCAN_INTERVAL])
+        hub = ClageHomeServerHub(
+            create_session(longest_interval.total_seconds() * KEEPALIVE_FACTOR),
+            ip_address,
+        )
+        hubs[ip_address] = hub
+    return ClageHomeServerClient(hub, homeserver_id, heater_id)
 
-    homeserver_state_fetcher = HomeserverStateFetcher(hass)
 
+@core.callback
+def _async_create_coordinator(hass, homeserver_name, homeserver, options):
+    """Create the coordinator, that polls a single homeserver"""
+
+    circuit_breaker = CircuitBreaker()
+    decoder = StateDecoder(homeserver_name)
+    history = SampleHistory()
+    request_metrics = RequestMetrics()
+    snapshot = StateSnapshot(hass, homeserver_name)
+    homeserver_state_fetcher = HomeserverStateFetcher(
+        hass,
+        homeserver_name,
+        homeserver,
+        hass.data[DOMAIN]["semaphore"],
+        hass.data[DOMAIN]["request_timeout"],
+        options,
+        circuit_breaker,
+        decoder,
+        history,
+        request_metrics,
+        snapshot,
+    )
+
+    # The coordinator of the heater is refreshed by the one of its hub
     coordinator = DataUpdateCoordinator(
         hass,
         _LOGGER,
-        name=DOMAIN,
+        name=f"{DOMAIN}_{homeserver_name}",
         update_method=homeserver_state_fetcher.fetch_states,
-        update_interval=scan_interval,
+        update_interval=None,
+        # Refreshes requested after writes are collapsed into a single one.
+        request_refresh_debouncer=Debouncer(
+            hass, _LOGGER, cooldown=REQUEST_REFRESH_COOLDOWN, immediate=False
+        ),
     )
     homeserver_state_fetcher.coordinator = coordinator
+    _async_hub_fetcher(hass, homeserver.ip_address).async_add_heater(
+        homeserver_name, homeserver_state_fetcher
+    )
 
-    hass.data[DOMAIN]["coordinator"] = coordinator
+    hass.data[DOMAIN]["coordinators"][homeserver_name] = coordinator
+    hass.data[DOMAIN]["circuit_breakers"][homeserver_name] = circuit_breaker
+    hass.data[DOMAIN]["decoders"][homeserver_name] = decoder
+    hass.data[DOMAIN]["histories"][homeserver_name] = history
+    hass.data[DOMAIN]["request_metrics"][homeserver_name] = request_metrics
+    hass.data[DOMAIN]["snapshots"][homeserver_name] = snapshot
+    return coordinator
 
-    await coordinator.async_refresh()
 
-    async def async_handle_set_temperature(call):
-        """Handle the service call to set the temperature of the heater."""
-        homeserver_name_input = call.data.get(SERVICE_HOMESERVE_NAME_ATTRIBUTE, "")
-        heater_id_input = call.data.get(SERVICE_HEATER_ID_ATTRIBUTE, "")
-        temperature_input = call.data.get(SERVICE_HEATER_TEMPERATURE, "")
-        temperature = 0
-        if isinstance(temperature_input, str):
-            if temperature_input.isnumeric():
-                temperature = int(temperature_input)
-            elif valid_entity_id(temperature_input):
-                temperature = int(hass.states.get(temperature_input).state)
-            else:
+@core.callback
+def _async_hub_fetcher(hass, ip_address):
+    """Return the status fetcher of a hub, created with its first heater"""
+
+    hub_fetchers = hass.data[DOMAIN]["hub_fetchers"]
+    hub_fetcher = hub_fetchers.get(ip_address)
+    if hub_fetcher is None:
+        hub_fetcher = HubStatusFetcher(
+            hass.data[DOMAIN]["hubs"][ip_address],
+            hass.data[DOMAIN]["semaphore"],
+            hass.data[DOMAIN]["request_timeout"],
+        )
+        hub_fetcher.coordinator = DataUpdateCoordinator(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_hub_{ip_address}",
+            update_method=hub_fetcher.fetch_statuses,
+        )
+        hub_fetchers[ip_address] = hub_fetcher
+    return hub_fetcher
+
+
+def _parse_temperature(hass, temperature_input):
+    """Return the temperature of a service call, limited to 10-60 °C.
+
+    Return None, if there is no valid temperature.
+    """
+    temperature = 0
+    if isinstance(temperature_input, str):
+        if temperature_input.isnumeric():
+            temperature = int(temperature_input)
+        elif valid_entity_id(temperature_input):
+            state = hass.states.get(temperature_input)
+            try:
+                temperature = int(state.state)
+            except (AttributeError, ValueError):
+                # A missing entity or an unavailable or non-numeric state
                 _LOGGER.error(
-                    "No valid value for '%s': %s",
+                    "No valid value for '%s' in %s: %s",
                     SERVICE_HEATER_TEMPERATURE,
-                    temperature,
+                    temperature_input,
+                    state.state if state else None,
                 )
-                return
+                return None
         else:
-            temperature = temperature_input
+            _LOGGER.error(
+                "No valid value for '%s': %s",
+                SERVICE_HEATER_TEMPERATURE,
+                temperature_input,
+            )
+            return None
+    else:
+        temperature = temperature_input
+
+    return min(max(temperature, 10), 60)
+
+
+async def _async_write_temperature(hass, homeserver_name, temperature, force=False):
+    """Write the setpoint of a heater and publish the status of the response.
+
+    Return False without writing, if the known setpoint already matches.
+    The setpoint is only known after a successful poll; neither the states
+    of a failed poll nor the restored ones of the last run can be trusted.
+    """
+    homeserver = hass.data[DOMAIN]["api"][homeserver_name]
+    coordinator = hass.data[DOMAIN]["coordinators"][homeserver_name]
+    if (
+        not force
+        and coordinator.last_update_success
+        and coordinator.data
+        and not coordinator.data.get(STALE)
+        and coordinator.data.get("heater_status_setpoint") == temperature
+    ):
+        suppressed_writes = hass.data[DOMAIN]["suppressed_writes"]
+        suppressed_writes[homeserver_name] = (
+            suppressed_writes.get(homeserver_name, 0) + 1
+        )
+        _LOGGER.debug(
+            "Setpoint of homeserver '%s' is already %s °C", homeserver_name, temperature
+        )
+        return False
+
+    with hass.data[DOMAIN]["request_metrics"][homeserver_name].measure(
+        ENDPOINT_SET_TEMPERATURE
+    ):
+        status = await homeserver.async_set_temperature(temperature)
+    status = hass.data[DOMAIN]["decoders"][homeserver_name].decode(status)
+    # The response already contains the new setpoint, so the states are not
+    # stale any longer, even if they have been restored from the last run.
+    states = {**(coordinator.data or {}), **status}
+    states.pop(STALE, None)
+    coordinator.async_set_updated_data(states)
+    return True
+
+
+@core.callback
+def _homeserver_names_of_entities(hass, entity_ids):
+    """Return the names of the homeservers, the entities belong to"""
+    entity_registry = er.async_get(hass)
+    device_registry = dr.async_get(hass)
+    homeserver_names = set()
+    for entity_id in entity_ids:
+        entity = entity_registry.async_get(entity_id)
+        if entity is None or entity.device_id is None:
+            _LOGGER.error("Entity '%s' is no CLAGE Homeserver entity", entity_id)
+            continue
+        device = device_registry.async_get(entity.device_id)
+        homeserver_names.update(
+            identifier for domain, identifier in device.identifiers if domain == DOMAIN
+        )
+    return homeserver_names
+
+
+async def _async_restore_snapshot(hass, homeserver_name, coordinator):
+    """Publish the states of the last run, marked as stale"""
+
+    stored = await hass.data[DOMAIN]["snapshots"][homeserver_name].async_load()
+    if not stored:
+        return
+    states = hass.data[DOMAIN]["decoders"][homeserver_name].decode(stored)
+    states[STALE] = True
+    coordinator.async_set_updated_data(states)
+    _LOGGER.debug(
+        "Restored the states of the CLAGE Homeserver '%s' of the last run",
+        homeserver_name,
+    )
+
+
+async def _async_first_refresh(hass, hub_fetcher, homeserver_names):
+    """Fetch the first states of the heaters of a hub and track the startup time"""
+
+    started = time.monotonic()
+    await hub_fetcher.coordinator.async_refresh()
+    finished = time.monotonic()
+
+    for homeserver_name in homeserver_names:
+        hass.data[DOMAIN]["startup_times"][homeserver_name] = {
+            "first_refresh": finished - started,
+            "since_setup": finished - hass.data[DOMAIN]["setup_started"],
+        }
+        _LOGGER.info(
+            "First states of the CLAGE Homeserver '%s' fetched in %.2f s (%.2f s after the setup started)",
+            homeserver_name,
+            finished - started,
+            finished - hass.data[DOMAIN]["setup_started"],
+        )
+
+
+@core.callback
+def _async_setup_data(hass, max_concurrent_requests, request_timeout):
+    """Create the empty state of the integration in hass.data"""
+
+    hass.data[DOMAIN] = {
+        "setup_started": time.monotonic(),
+        "startup_times": {},
+        "hubs": {},
+        "api": {},
+        "coordinators": {},
+        "hub_fetchers": {},
+        "circuit_breakers": {},
+        "decoders": {},
+        "histories": {},
+        "request_metrics": {},
+        "snapshots": {},
+        "profiler": None,
+        "skipped_state_writes": {},
+        "suppressed_writes": {},
+        "semaphore": asyncio.Semaphore(max_concurrent_requests),
+        "request_timeout": request_timeout,
+    }
+
+
+async def async_setup(hass: core.HomeAssistant, config: dict) -> bool:
+    """Set up clage_homeserver platforms and services."""
+
+    _LOGGER.debug("clage_homeserver: async_setup")
+    max_concurrent_requests = DEFAULT_MAX_CONCURRENT_REQUESTS
+    request_timeout = DEFAULT_REQUEST_TIMEOUT
+    options = dict(DEFAULT_POLLING_OPTIONS)
+    homeservers = []
+    if DOMAIN in config:
+        max_concurrent_requests = config[DOMAIN].get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+        request_timeout = config[DOMAIN].get(
+            CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+        )
+        options = {
+            key: config[DOMAIN].get(key, default)
+            for key, default in DEFAULT_POLLING_OPTIONS.items()
+        }
+
+        homeservers = config[DOMAIN].get(CONF_HOMESERVERS, [])
+
+    _async_setup_data(hass, max_concurrent_requests, request_timeout)
+    homeserver_api = hass.data[DOMAIN]["api"]
+    if homeservers:
+        await async_import_library(hass)
+
+    for homeserver in homeservers:
+        homeserver_name = homeserver[0][CONF_NAME]
+        ip_address = homeserver[0][CONF_HOMESERVER_IP_ADDRESS]
+        homeserver_id = homeserver[0][CONF_HOMESERVER_ID]
+        heater_id = homeserver[0][CONF_HEATER_ID]
+        _LOGGER.info(
+            "Setup: ip_address: '%s', homeserver_id: '%s', heater_id: '%s'",
+            ip_address,
+            homeserver_id,
+            heater_id,
+        )
+        clage_home_server = _create_client(
+            hass, ip_address, homeserver_id, heater_id, options
+        )
+        homeserver_api[homeserver_name] = clage_home_server
+
+    async def async_close_clients(event):
+        """Close the sessions of all homeservers when Home Assistant stops."""
+        await asyncio.gather(
+            *(
+                clage_homeserver.async_close()
+                for clage_homeserver in hass.data[DOMAIN]["api"].values()
+            )
+        )
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_close_clients)
+
+    coordinators = {
+        homeserver_name: _async_create_coordinator(
+            hass, homeserver_name, clage_home_server, options
+        )
+        for homeserver_name, clage_home_server in homeserver_api.items()
+    }
 
-        temperature = min(max(temperature, 10), 60)
+    # All YAML homeservers are restored at once and fetched in the
+    # background; every config entry only handles its own homeserver in
+    # async_setup_entry.
+    await asyncio.gather(
+        *(
+            _async_restore_snapshot(hass, homeserver_name, coordinator)
+            for homeserver_name, coordinator in coordinators.items()
+        )
+    )
+    hub_heaters = {}
+    for homeserver_name, clage_home_server in homeserver_api.items():
+        hub_heaters.setdefault(clage_home_server.ip_address, []).append(homeserver_name)
+    for ip_address, homeserver_names in hub_heaters.items():
+        hass.async_create_task(
+            _async_first_refresh(
+                hass, hass.data[DOMAIN]["hub_fetchers"][ip_address], homeserver_names
+            )
+        )
+
+    async def async_handle_set_temperature(call):
+        """Handle the service call to set the temperature of the heater."""
+        homeserver_name_input = call.data.get(SERVICE_HOMESERVE_NAME_ATTRIBUTE, "")
+        heater_id_input = call.data.get(SERVICE_HEATER_ID_ATTRIBUTE, "")
+        temperature_input = call.data.get(SERVICE_HEATER_TEMPERATURE, "")
+        temperature = _parse_temperature(hass, temperature_input)
+        if temperature is None:
+            return
 
         if (len(heater_id_input) > 0) and len(heater_id_input) > 0:
             _LOGGER.debug(
@@ -226,27 +1073,171 @@ async def async_setup(hass: core.HomeAssistant, config: dict) -> bool:
             )
 
             try:
-                homeservers = hass.data[DOMAIN]["api"]
-                homeserver = homeservers[homeserver_name_input]
-                await hass.async_add_executor_job(
-                    homeserver.setTemperature,
+                if await _async_write_temperature(
+                    hass,
+                    homeserver_name_input,
                     temperature,
-                )
+                    cv.boolean(call.data.get(SERVICE_FORCE_ATTRIBUTE, False)),
+                ):
+                    await hass.data[DOMAIN]["coordinators"][
+                        homeserver_name_input
+                    ].async_request_refresh()
             except KeyError:
                 _LOGGER.error("Heater with id '%s' not found!", heater_id_input)
+            except ClageHomeServerError as err:
+                _LOGGER.error(
+                    "Could not set the temperature of heater '%s': %s",
+                    heater_id_input,
+                    err,
+                )
 
-        await hass.data[DOMAIN]["coordinator"].async_refresh()
+    async def async_handle_set_temperature_many(call):
+        """Handle the service call to set the temperature of many heaters."""
+        targets = [
+            (
+                target[SERVICE_HOMESERVE_NAME_ATTRIBUTE],
+                target.get(SERVICE_HEATER_ID_ATTRIBUTE),
+                target[SERVICE_HEATER_TEMPERATURE],
+            )
+            for target in call.data[SERVICE_TARGETS_ATTRIBUTE]
+        ]
+        targets.extend(
+            (homeserver_name, None, call.data.get(SERVICE_HEATER_TEMPERATURE, ""))
+            for homeserver_name in _homeserver_names_of_entities(
+                hass, call.data[ATTR_ENTITY_ID]
+            )
+        )
+
+        async def _async_set_target(homeserver_name, heater_id, temperature_input):
+            result = {
+                SERVICE_HOMESERVE_NAME_ATTRIBUTE: homeserver_name,
+                SERVICE_HEATER_ID_ATTRIBUTE: heater_id,
+                SERVICE_HEATER_TEMPERATURE: None,
+                "success": False,
+                "suppressed": False,
+                "error": None,
+            }
+            temperature = _parse_temperature(hass, temperature_input)
+            homeserver = hass.data[DOMAIN]["api"].get(homeserver_name)
+            if temperature is None:
+                result["error"] = f"No valid temperature: {temperature_input}"
+            elif homeserver is None or heater_id not in (None, homeserver.heater_id):
+                result["error"] = "Heater not found"
+            else:
+                result[SERVICE_HEATER_ID_ATTRIBUTE] = homeserver.heater_id
+                result[SERVICE_HEATER_TEMPERATURE] = temperature
+                async with hass.data[DOMAIN]["semaphore"]:
+                    try:
+                        result["suppressed"] = not await _async_write_temperature(
+                            hass,
+                            homeserver_name,
+                            temperature,
+                            call.data[SERVICE_FORCE_ATTRIBUTE],
+                        )
+                        result["success"] = True
+                    except ClageHomeServerError as err:
+                        result["error"] = str(err)
+            if result["error"]:
+                _LOGGER.error(
+                    "Could not set the temperature of homeserver '%s': %s",
+                    homeserver_name,
+                    result["error"],
+                )
+            return result
+
+        results = await asyncio.gather(
+            *(_async_set_target(*target) for target in targets)
+        )
+
+        # A single refresh of every homeserver that has been written to
+        for homeserver_name in {
+            result[SERVICE_HOMESERVE_NAME_ATTRIBUTE]
+            for result in results
+            if result["success"] and not result["suppressed"]
+        }:
+            await hass.data[DOMAIN]["coordinators"][
+                homeserver_name
+            ].async_request_refresh()
+
+        return {"results": results}
+
+    async def async_handle_get_history(call):
+        """Handle the service call to read the recent samples of a heater."""
+        homeserver_name = call.data[SERVICE_HOMESERVE_NAME_ATTRIBUTE]
+        history = hass.data[DOMAIN]["histories"].get(homeserver_name)
+        if history is None:
+            raise HomeAssistantError(f"Homeserver '{homeserver_name}' not found")
+
+        start = call.data.get(SERVICE_START_ATTRIBUTE)
+        end = call.data.get(SERVICE_END_ATTRIBUTE)
+        # A naive time is in the time zone of Home Assistant, not of the OS
+        samples = history.samples(
+            None if start is None else dt_util.as_utc(start).timestamp(),
+            None if end is None else dt_util.as_utc(end).timestamp(),
+        )
+        return {
+            SERVICE_HOMESERVE_NAME_ATTRIBUTE: homeserver_name,
+            "samples": [
+                {"time": dt_util.utc_from_timestamp(timestamp).isoformat(), **values}
+                for timestamp, values in samples
+            ],
+        }
+
+    async def async_handle_profile(call):
+        """Handle the service call to profile the next ticks of the polling."""
+        if hass.data[DOMAIN]["profiler"] is not None:
+            raise HomeAssistantError("A profile of the CLAGE Homeservers is running")
+
+        homeserver_names = list(hass.data[DOMAIN]["coordinators"])
+        homeserver_name = call.data.get(SERVICE_HOMESERVE_NAME_ATTRIBUTE)
+        if homeserver_name is not None:
+            if homeserver_name not in homeserver_names:
+                raise HomeAssistantError(f"Homeserver '{homeserver_name}' not found")
+            homeserver_names = [homeserver_name]
+        if not homeserver_names:
+            raise HomeAssistantError("No CLAGE Homeserver to profile")
+
+        profiler = TickProfiler(
+            hass,
+            homeserver_names,
+            call.data[SERVICE_TICKS_ATTRIBUTE],
+            hass.config.path(f"{DOMAIN}_profile_{dt_util.utcnow():%Y%m%d_%H%M%S}.txt"),
+        )
+        hass.data[DOMAIN]["profiler"] = profiler
+        profiler.async_start()
 
     hass.services.async_register(
         DOMAIN, "set_temperature", async_handle_set_temperature
     )
+    hass.services.async_register(
+        DOMAIN,
+        "set_temperature_many",
+        async_handle_set_temperature_many,
+        schema=SET_TEMPERATURE_MANY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_history",
+        async_handle_get_history,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, "profile", async_handle_profile, schema=PROFILE_SCHEMA
+    )
 
     hass.async_create_task(
         async_load_platform(
             hass,
             "sensor",
             DOMAIN,
-            {CONF_HOMESERVERS: homeservers, HOMESERVER_API: homeserver_api},
+            {
+                CONF_HOMESERVERS: homeservers,
+                HOMESERVER_API: homeserver_api,
+                CONF_SENSOR_GROUPS: options[CONF_SENSOR_GROUPS],
+                CONF_LOCAL_CONSUMPTION: options[CONF_LOCAL_CONSUMPTION],
+            },
             config,
         )
     )
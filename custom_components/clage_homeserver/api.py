@@ -0,0 +1,278 @@
+"""Asynchronous client for the local REST API of the CLAGE Homeserver"""
+import asyncio
+import importlib
+import logging
+import sys
+import time
+from http import HTTPStatus
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+USERNAME = "appuser"
+PASSWORD = "smart"
+REQUEST_TIMEOUT = 5
+CONNECTIONS_PER_HOMESERVER = 1
+SHARED_RESPONSE_MAX_AGE = 4
+
+NUMBER_OF_CONNECTED_HEATERS = 1
+
+# The library is only used for its mapper; it imports requests, which is
+# too slow to import with the integration on the event loop.
+LIBRARY = "clage_homeserver"
+
+
+class ClageHomeServerError(Exception):
+    """Error while communicating with the CLAGE Homeserver."""
+
+
+async def async_import_library(hass):
+    """Import the library in the executor before the first client is created"""
+    if LIBRARY not in sys.modules:
+        await hass.async_add_executor_job(importlib.import_module, LIBRARY)
+
+
+def create_session(keepalive_timeout):
+    """Create the pooled session used by the client of a single homeserver.
+
+    The keep-alive timeout has to be longer than the scan interval, otherwise
+    the idle connection is closed between two ticks and every poll pays for a
+    new TCP and TLS handshake on the small CPU of the homeserver.
+    """
+    connector = aiohttp.TCPConnector(
+        ssl=False,
+        limit_per_host=CONNECTIONS_PER_HOMESERVER,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+class ClageHomeServerHub:
+    """Connection to a homeserver, shared by the clients of all its heaters.
+
+    The status of all heaters on the bus is requested at once (see
+    async_request_statuses). The consumption totals of every heater are
+    also sent once and shared by all heaters for SHARED_RESPONSE_MAX_AGE
+    seconds. The hub owns the session and closes it with its last client.
+    """
+
+    def __init__(self, session, ip_address):
+        if not ip_address:
+            raise ValueError("ipAddress must be specified")
+        self._session = session
+        self._auth = aiohttp.BasicAuth(USERNAME, PASSWORD)
+        self._timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        self._shared_responses = {}
+        self._pending_responses = {}
+        self.ip_address = ip_address
+        self.clients = 0
+        self.status_of_all_heaters = True
+
+    @property
+    def closed(self):
+        """Return True if the session of the hub has been closed"""
+        return self._session.closed
+
+    async def async_release(self):
+        """Release a client and close the session after the last one"""
+        self.clients -= 1
+        if self.clients <= 0 and not self._session.closed:
+            await self._session.close()
+
+    async def async_request(self, method, path, data=None):
+        """Send a request to the homeserver and return the decoded JSON body"""
+        url = f"https://{self.ip_address}{path}"
+        if self._session.closed:
+            # aiohttp raises a RuntimeError, that no caller would expect
+            raise ClageHomeServerError(f"Request {method} {url} on a closed session")
+        if method != "GET":
+            # A write changes the state, that the shared responses contain
+            self._shared_responses.clear()
+        try:
+            async with self._session.request(
+                method,
+                url,
+                auth=self._auth,
+                data=data,
+                ssl=False,
+                timeout=self._timeout,
+            ) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+            raise ClageHomeServerError(
+                f"Request {method} {url} failed: {err!r}"
+            ) from err
+
+    async def async_request_statuses(self):
+        """Return the raw status responses of all heaters by their id.
+
+        GET /devices/status without a heater id returns every heater on the
+        bus. A homeserver, that does not know the request, is asked for every
+        heater on its own from then on and an empty dict is returned.
+        """
+        try:
+            response = await self.async_request("GET", "/devices/status")
+        except ClageHomeServerError as err:
+            if not isinstance(err.__cause__, aiohttp.ClientResponseError) or (
+                err.__cause__.status
+                not in (HTTPStatus.NOT_FOUND, HTTPStatus.METHOD_NOT_ALLOWED)
+            ):
+                raise
+            _LOGGER.info(
+                "Homeserver %s returns no status of all heaters, requesting "
+                "them one by one: %s",
+                self.ip_address,
+                err,
+            )
+            self.status_of_all_heaters = False
+            return {}
+
+        devices = response.get("devices") if isinstance(response, dict) else None
+        return {
+            device["id"]: {**response, "devices": [device]}
+            for device in devices or []
+            if isinstance(device, dict) and "id" in device
+        }
+
+    async def async_request_shared(self, path):
+        """Send a GET request, whose response is shared by all heaters"""
+        shared_response = self._shared_responses.get(path)
+        if shared_response is not None:
+            received, response = shared_response
+            if time.monotonic() - received < SHARED_RESPONSE_MAX_AGE:
+                return response
+
+        pending = self._pending_responses.get(path)
+        if pending is None:
+            pending = asyncio.ensure_future(self._async_request_shared(path))
+            self._pending_responses[path] = pending
+        # The request is shielded, so one cancelled heater does not cancel
+        # the request for the others.
+        return await asyncio.shield(pending)
+
+    async def _async_request_shared(self, path):
+        try:
+            response = await self.async_request("GET", path)
+            self._shared_responses[path] = (time.monotonic(), response)
+            return response
+        finally:
+            self._pending_responses.pop(path, None)
+
+
+class ClageHomeServerClient:
+    """Client for the REST API of a heater on a CLAGE Homeserver.
+
+    The methods mirror the blocking clage_homeserver.ClageHomeServer, but run
+    on the event loop and use the keep-alive connection of the hub of the
+    homeserver instead of blocking an executor thread per request.
+    """
+
+    def __init__(self, hub, homeserver_id, heater_id):
+        if not homeserver_id:
+            raise ValueError("homeserverId must be specified")
+        if not heater_id:
+            raise ValueError("heaterId must be specified")
+        self._hub = hub
+        self._hub.clients += 1
+        self._mapper = importlib.import_module(LIBRARY).ClageHomeServerMapper()
+        self.ip_address = hub.ip_address
+        self.homeserver_id = homeserver_id
+        self.heater_id = heater_id
+
+    async def async_close(self):
+        """Release the hub; the last client closes its session"""
+        await self._hub.async_release()
+
+    def _map(self, mapping, payload):
+        """Map a raw API response, failing with ClageHomeServerError"""
+        try:
+            return mapping(payload)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as err:
+            raise ClageHomeServerError(
+                f"Unexpected response from homeserver {self.ip_address}: {err!r}"
+            ) from err
+
+    def _heater_response(self, response):
+        """Reduce a response with all heaters to the one of this heater"""
+        devices = response.get("devices") if isinstance(response, dict) else None
+        for device in devices or []:
+            if isinstance(device, dict) and device.get("id") == self.heater_id:
+                return {**response, "devices": [device]}
+        if devices and len(devices) == 1:
+            # The only heater, like the library assumes, whatever its id
+            return response
+        raise ClageHomeServerError(
+            f"Heater {self.heater_id} not found on homeserver {self.ip_address}"
+        )
+
+    async def async_request_status(self, status=None):
+        """Return the mapped status of the heater.
+
+        The raw status, that the hub polled for all its heaters, is passed
+        in; without it the status of the heater is requested on its own.
+        """
+        if status is None:
+            status = await self._hub.async_request(
+                "GET", f"/devices/status/{self.heater_id}"
+            )
+        return self._map(self._mapper.mapApiStatusResponse, status)
+
+    async def async_request_setup(self):
+        """Return the mapped setup of the heater"""
+        setup = await self._hub.async_request("GET", f"/devices/setup/{self.heater_id}")
+        return self._map(self._mapper.mapApiSetupResponse, setup)
+
+    async def async_get_consumption_totals(self):
+        """Return the consumption totals of the heater"""
+        totals = await self._hub.async_request_shared("/devices/logs?showTotal=true")
+        return self._map(_map_consumption_totals, self._heater_response(totals))
+
+    async def async_get_consumption_log(self):
+        """Return the entries of the consumption log of the heater"""
+        logs = await self._hub.async_request("GET", f"/devices/logs/{self.heater_id}")
+        return self._map(_map_consumption_log, logs)
+
+    async def async_set_temperature(self, temperature):
+        """Set the setpoint of the heater and return the mapped status"""
+        status = await self._hub.async_request(
+            "PUT",
+            f"/devices/setpoint/{self.heater_id}",
+            data={"data": str(int(temperature * 10)), "cid": "1"},
+        )
+        return self._map(self._mapper.mapApiStatusResponse, status)
+
+
+def _map_consumption_totals(totals):
+    """Map the response of the logs request with the totals of the heater"""
+
+    heater = totals.get("devices")[NUMBER_OF_CONNECTED_HEATERS - 1]
+    heater_logs = heater.get("logs")[0]
+
+    usage_time = int(heater_logs.get("length"))  # s
+    consumption_energy = round(int(heater_logs.get("power")) / 1000, 2)  # Wh => kWh
+    consumption_water = round(int(heater_logs.get("water")) / 100, 1)  # 1/100 l => l
+
+    return {
+        "number_of_watertaps": 0,  # not supported in the totals request
+        "usage_time": round(usage_time / 60, 0),  # minutes
+        "consumption_energy": consumption_energy,
+        "consumption_water": consumption_water,
+    }
+
+
+def _map_consumption_log(logs):
+    """Map the response of the logs request to a list sorted by the log id"""
+
+    heater = logs.get("devices")[NUMBER_OF_CONNECTED_HEATERS - 1]
+    entries = [
+        {
+            "id": int(log["id"]),
+            "length": int(log["length"]),  # s
+            "power": int(log["power"]),  # Wh
+            "water": int(log["water"]),  # 1/100 l
+        }
+        for log in heater.get("logs")
+    ]
+    return sorted(entries, key=lambda entry: entry["id"])
@@ -0,0 +1,63 @@
+"""Circuit breaker for the polling of an unreachable homeserver"""
+import random
+from datetime import timedelta
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+MAX_BACKOFF_EXPONENT = 16
+
+
+class CircuitBreaker:
+    """Track the consecutive failures of a homeserver.
+
+    After failure_threshold consecutive failures the circuit opens and the
+    homeserver is only retried after an exponential backoff with jitter, so
+    a homeserver that is switched off costs almost nothing.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=3,
+        base_backoff=timedelta(seconds=30),
+        max_backoff=timedelta(minutes=10),
+    ):
+        self._failure_threshold = failure_threshold
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.retry_in = None
+
+    def attempt(self):
+        """Mark the start of a poll; an open circuit is tried half-open"""
+        if self.state == STATE_OPEN:
+            self.state = STATE_HALF_OPEN
+
+    def record_success(self):
+        """Close the circuit; return True if it was not closed before"""
+        was_open = self.state != STATE_CLOSED
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.retry_in = None
+        return was_open
+
+    def record_failure(self, min_backoff=timedelta(0)):
+        """Count a failure; return the delay until the next retry if open.
+
+        The delay is never shorter than min_backoff, so an open circuit never
+        polls more often than the homeserver is polled normally.
+        """
+        self.consecutive_failures += 1
+        if self.consecutive_failures < self._failure_threshold:
+            return None
+
+        exponent = min(
+            self.consecutive_failures - self._failure_threshold,
+            MAX_BACKOFF_EXPONENT,
+        )
+        backoff = min(self._base_backoff * 2**exponent, self._max_backoff)
+        self.state = STATE_OPEN
+        self.retry_in = max(backoff * random.uniform(0.5, 1.0), min_backoff)
+        return self.retry_in
@@ -5,12 +5,11 @@ from datetime import timedelta
 
 from typing import Any
 
-from requests.exceptions import ConnectTimeout, HTTPError
-import clage_homeserver
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.const import CONF_API_KEY, CONF_NAME
+import homeassistant.helpers.config_validation as cv
+from homeassistant.const import CONF_API_KEY, CONF_NAME, CONF_SCAN_INTERVAL
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.util import slugify
@@ -21,6 +20,21 @@ from .const import (
     CONF_HOMESERVER_ID,
     CONF_HEATER_ID,
     CONF_NAME,
+    CONF_SETUP_SCAN_INTERVAL,
+    CONF_CONSUMPTION_SCAN_INTERVAL,
+    DEFAULT_SETUP_UPDATE_INTERVAL,
+    DEFAULT_CONSUMPTION_UPDATE_INTERVAL,
+    CONF_INCREMENTAL_CONSUMPTION,
+    CONF_LOCAL_CONSUMPTION,
+    CONF_ADAPTIVE_POLLING,
+    CONF_IDLE_SCAN_INTERVAL,
+    DEFAULT_IDLE_UPDATE_INTERVAL,
+    CONF_SENSOR_GROUPS,
+    SENSOR_GROUP_CORE,
+    SENSOR_GROUP_ENERGY,
+    SENSOR_GROUP_DIAGNOSTICS,
+    SENSOR_GROUP_SETUP,
+    SENSOR_GROUPS,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -29,14 +43,21 @@ _LOGGER = logging.getLogger(__name__)
 DEFAULT_UPDATE_INTERVAL = timedelta(seconds=20)
 MIN_UPDATE_INTERVAL = timedelta(seconds=10)
 
+SENSOR_GROUP_LABELS = {
+    SENSOR_GROUP_CORE: "Core (temperatures, flow, power)",
+    SENSOR_GROUP_ENERGY: "Energy (consumption totals)",
+    SENSOR_GROUP_DIAGNOSTICS: "Diagnostics (radio, internal values)",
+    SENSOR_GROUP_SETUP: "Setup (serial numbers, settings, timers)",
+}
+
 
 @callback
 def clage_homeserver_entries(hass: HomeAssistant):
-    """Return the site_ids for the domain."""
+    """Return the (ip address, heater id) pairs of the domain."""
 
     _LOGGER.debug("clage_homeserver_entries")
     return {
-        (entry.data[CONF_HOMESERVER_IP_ADDRESS])
+        (entry.data[CONF_HOMESERVER_IP_ADDRESS], entry.data[CONF_HEATER_ID])
         for entry in hass.config_entries.async_entries(DOMAIN)
     }
 
@@ -50,9 +71,9 @@ class Clage_HomeserverConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize the config flow."""
         self._errors = {}
 
-    def _ip_address_in_configuration_exists(self, ip_address: str) -> bool:
-        """Return True if ip_address exists in configuration."""
-        return ip_address in clage_homeserver_entries(self.hass)
+    def _heater_in_configuration_exists(self, ip_address: str, heater_id: str) -> bool:
+        """Return True if the heater of the homeserver exists in configuration."""
+        return (ip_address, heater_id) in clage_homeserver_entries(self.hass)
 
     def _homeserver_id_in_configuration_exists(self, homeserver_id: str) -> bool:
         """Return True if homeserver_id exists in configuration."""
@@ -66,6 +87,10 @@ class Clage_HomeserverConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self, ip_address: str, homeserver_id: str, heater_id: str
     ) -> bool:
         """Check if we can connect to the soleredge api service."""
+        # Imported in the executor, the library and requests are slow to import
+        import clage_homeserver
+        from requests.exceptions import ConnectTimeout, HTTPError
+
         api = clage_homeserver.ClageHomeServer(
             ipAddress=ip_address, homeserverId=homeserver_id, heaterId=heater_id
         )
@@ -89,8 +114,8 @@ class Clage_HomeserverConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._errors = {}
         if user_input is not None:
             name = slugify(user_input.get(CONF_NAME))
-            if self._ip_address_in_configuration_exists(
-                user_input[CONF_HOMESERVER_IP_ADDRESS]
+            if self._heater_in_configuration_exists(
+                user_input[CONF_HOMESERVER_IP_ADDRESS], user_input[CONF_HEATER_ID]
             ):
                 self._errors[CONF_HOMESERVER_IP_ADDRESS] = "already_configured"
             else:
@@ -108,6 +133,22 @@ class Clage_HomeserverConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                             CONF_HOMESERVER_IP_ADDRESS: ip_address,
                             CONF_HOMESERVER_ID: homeserver_id,
                             CONF_HEATER_ID: heater_id,
+                            CONF_SCAN_INTERVAL: user_input[CONF_SCAN_INTERVAL],
+                            CONF_SETUP_SCAN_INTERVAL: user_input[
+                                CONF_SETUP_SCAN_INTERVAL
+                            ],
+                            CONF_CONSUMPTION_SCAN_INTERVAL: user_input[
+                                CONF_CONSUMPTION_SCAN_INTERVAL
+                            ],
+                            CONF_INCREMENTAL_CONSUMPTION: user_input[
+                                CONF_INCREMENTAL_CONSUMPTION
+                            ],
+                            CONF_LOCAL_CONSUMPTION: user_input[CONF_LOCAL_CONSUMPTION],
+                            CONF_ADAPTIVE_POLLING: user_input[CONF_ADAPTIVE_POLLING],
+                            CONF_IDLE_SCAN_INTERVAL: user_input[
+                                CONF_IDLE_SCAN_INTERVAL
+                            ],
+                            CONF_SENSOR_GROUPS: user_input[CONF_SENSOR_GROUPS],
                         },
                     )
 
@@ -117,6 +158,20 @@ class Clage_HomeserverConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 CONF_HOMESERVER_IP_ADDRESS: "",
                 CONF_HOMESERVER_ID: "",
                 CONF_HEATER_ID: "",
+                CONF_SCAN_INTERVAL: int(DEFAULT_UPDATE_INTERVAL.total_seconds()),
+                CONF_SETUP_SCAN_INTERVAL: int(
+                    DEFAULT_SETUP_UPDATE_INTERVAL.total_seconds()
+                ),
+                CONF_CONSUMPTION_SCAN_INTERVAL: int(
+                    DEFAULT_CONSUMPTION_UPDATE_INTERVAL.total_seconds()
+                ),
+                CONF_INCREMENTAL_CONSUMPTION: False,
+                CONF_LOCAL_CONSUMPTION: False,
+                CONF_ADAPTIVE_POLLING: False,
+                CONF_IDLE_SCAN_INTERVAL: int(
+                    DEFAULT_IDLE_UPDATE_INTERVAL.total_seconds()
+                ),
+                CONF_SENSOR_GROUPS: SENSOR_GROUPS,
             }
         return self.async_show_form(
             step_id="user",
@@ -133,6 +188,50 @@ class Clage_HomeserverConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     vol.Required(
                         CONF_HEATER_ID, default=user_input[CONF_HEATER_ID]
                     ): str,
+                    vol.Optional(
+                        CONF_SCAN_INTERVAL,
+                        default=user_input[CONF_SCAN_INTERVAL],
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=int(MIN_UPDATE_INTERVAL.total_seconds())),
+                    ),
+                    vol.Optional(
+                        CONF_SETUP_SCAN_INTERVAL,
+                        default=user_input[CONF_SETUP_SCAN_INTERVAL],
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=int(MIN_UPDATE_INTERVAL.total_seconds())),
+                    ),
+                    vol.Optional(
+                        CONF_CONSUMPTION_SCAN_INTERVAL,
+                        default=user_input[CONF_CONSUMPTION_SCAN_INTERVAL],
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=int(MIN_UPDATE_INTERVAL.total_seconds())),
+                    ),
+                    vol.Optional(
+                        CONF_INCREMENTAL_CONSUMPTION,
+                        default=user_input[CONF_INCREMENTAL_CONSUMPTION],
+                    ): bool,
+                    vol.Optional(
+                        CONF_LOCAL_CONSUMPTION,
+                        default=user_input[CONF_LOCAL_CONSUMPTION],
+                    ): bool,
+                    vol.Optional(
+                        CONF_ADAPTIVE_POLLING,
+                        default=user_input[CONF_ADAPTIVE_POLLING],
+                    ): bool,
+                    vol.Optional(
+                        CONF_IDLE_SCAN_INTERVAL,
+                        default=user_input[CONF_IDLE_SCAN_INTERVAL],
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=int(MIN_UPDATE_INTERVAL.total_seconds())),
+                    ),
+                    vol.Optional(
+                        CONF_SENSOR_GROUPS,
+                        default=user_input[CONF_SENSOR_GROUPS],
+                    ): cv.multi_select(SENSOR_GROUP_LABELS),
                 }
             ),
             errors=self._errors,
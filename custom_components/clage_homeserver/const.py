@@ -1,5 +1,6 @@
 """Constants for the clage_homeserver integration."""
 
+from datetime import timedelta
 from typing import Literal
 
 DOMAIN = "clage_homeserver"
@@ -12,3 +13,31 @@ CONF_HOMESERVER_IP_ADDRESS = "ipAddress"
 CONF_HOMESERVER_ID = "homeserverId"
 CONF_HEATER_ID = "heaterId"
 HOMESERVER_API = "homeserverApi"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_REQUEST_TIMEOUT = "request_timeout"
+CONF_SETUP_SCAN_INTERVAL = "setup_scan_interval"
+CONF_CONSUMPTION_SCAN_INTERVAL = "consumption_scan_interval"
+CONF_INCREMENTAL_CONSUMPTION = "incremental_consumption"
+CONF_LOCAL_CONSUMPTION = "local_consumption"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_IDLE_SCAN_INTERVAL = "idle_scan_interval"
+CONF_SENSOR_GROUPS = "sensor_groups"
+
+SENSOR_GROUP_CORE = "core"
+SENSOR_GROUP_ENERGY = "energy"
+SENSOR_GROUP_DIAGNOSTICS = "diagnostics"
+SENSOR_GROUP_SETUP = "setup"
+SENSOR_GROUPS = [
+    SENSOR_GROUP_CORE,
+    SENSOR_GROUP_ENERGY,
+    SENSOR_GROUP_DIAGNOSTICS,
+    SENSOR_GROUP_SETUP,
+]
+
+DEFAULT_SETUP_UPDATE_INTERVAL = timedelta(hours=1)
+DEFAULT_CONSUMPTION_UPDATE_INTERVAL = timedelta(minutes=5)
+DEFAULT_IDLE_UPDATE_INTERVAL = timedelta(minutes=2)
+
+# Sent with the name of the homeserver after every poll, also after a failed
+# one, after which the coordinator does not always notify its listeners
+SIGNAL_POLLED = f"{DOMAIN}_polled_{{}}"
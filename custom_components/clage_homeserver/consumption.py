@@ -0,0 +1,195 @@
+"""Incremental aggregation of the consumption log of a heater"""
+import logging
+
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.consumption.{{}}"
+STORAGE_SAVE_DELAY = 10
+
+
+class IncrementalConsumption:
+    """Running consumption totals of a heater, persisted across restarts.
+
+    Only the log entries with an id above the stored cursor are added to the
+    totals, so the cost of a tick does not grow with the age of the device.
+    The totals are kept in the raw units of the API (s, Wh, 1/100 l).
+    """
+
+    def __init__(self, hass, homeserver_name):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(homeserver_name))
+        self._homeserver_name = homeserver_name
+        self._loaded = False
+        self._cursor = None
+        self._watertaps = 0
+        self._length = 0
+        self._energy = 0
+        self._water = 0
+
+    async def async_load(self):
+        """Load the cursor and the totals of the last run"""
+        if self._loaded:
+            return
+        stored = await self._store.async_load()
+        if stored:
+            self._cursor = stored["cursor"]
+            self._watertaps = stored["watertaps"]
+            self._length = stored["length"]
+            self._energy = stored["energy"]
+            self._water = stored["water"]
+        self._loaded = True
+
+    async def async_flush(self):
+        """Write a delayed save at once, e.g. before the homeserver is unloaded"""
+        if self._cursor is not None:
+            await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self):
+        return {
+            "cursor": self._cursor,
+            "watertaps": self._watertaps,
+            "length": self._length,
+            "energy": self._energy,
+            "water": self._water,
+        }
+
+    def add_entries(self, entries):
+        """Add the log entries newer than the cursor and return the totals"""
+
+        if entries and self._cursor is not None:
+            if max(entry["id"] for entry in entries) < self._cursor:
+                # The log of the device has been cleared; its ids start again.
+                _LOGGER.info(
+                    "Consumption log of the CLAGE Homeserver '%s' was reset",
+                    self._homeserver_name,
+                )
+                self._cursor = None
+
+        new_entries = [
+            entry
+            for entry in entries
+            if self._cursor is None or entry["id"] > self._cursor
+        ]
+        for entry in new_entries:
+            self._watertaps += 1
+            self._length += entry["length"]
+            self._energy += entry["power"]
+            self._water += entry["water"]
+
+        if new_entries:
+            self._cursor = max(entry["id"] for entry in new_entries)
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+        _LOGGER.debug(
+            "Added %s new consumption log entries of the CLAGE Homeserver '%s'",
+            len(new_entries),
+            self._homeserver_name,
+        )
+        return self.totals
+
+    @property
+    def totals(self):
+        """Return the totals with the units of the consumption sensors"""
+        return {
+            "number_of_watertaps": self._watertaps,
+            "usage_time": round(self._length / 60, 0),  # s => min
+            "consumption_energy": round(self._energy / 1000, 2),  # Wh => kWh
+            "consumption_water": round(self._water / 100, 1),  # 1/100 l => l
+        }
+
+
+async def async_remove_consumption(hass, homeserver_name):
+    """Remove the cursor and the totals of a removed homeserver"""
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(homeserver_name))
+    await store.async_remove()
+
+
+# A longer gap between two samples (e.g. an unreachable homeserver) is not
+# integrated; the next sync with the device totals covers it.
+MAX_SAMPLE_GAP = 300  # s
+
+
+class LocalConsumption:
+    """Energy and water totals of a heater, integrated from its status.
+
+    Between two fetches of the totals of the device, the power and the flow
+    of every status poll are integrated on top of the last device totals, so
+    the totals change with every cheap status request. Every fetch of the
+    device totals re-syncs the integration and measures its drift. The
+    published totals never decrease, as the sensors are total increasing.
+    """
+
+    def __init__(self, homeserver_name):
+        self._homeserver_name = homeserver_name
+        self._last_time = None
+        self._last_power = 0.0  # kW
+        self._last_flow = 0.0  # l/min
+        self._device_energy = None  # kWh at the last sync
+        self._device_water = None  # l at the last sync
+        self._energy = 0.0  # kWh since the last sync
+        self._water = 0.0  # l since the last sync
+        self._published_energy = 0.0
+        self._published_water = 0.0
+        self._energy_drift = None
+        self._water_drift = None
+
+    def add_sample(self, timestamp, states):
+        """Integrate up to the status at the time stamp (s) and return the totals"""
+        if self._last_time is not None:
+            elapsed = timestamp - self._last_time
+            if 0 < elapsed <= MAX_SAMPLE_GAP:
+                self._energy += self._last_power * elapsed / 3600
+                self._water += self._last_flow * elapsed / 60
+        self._last_time = timestamp
+        self._last_power = states.get("heater_status_power") or 0.0
+        self._last_flow = states.get("heater_status_flow") or 0.0
+        return self._publish()
+
+    def sync(self, totals):
+        """Re-sync with the totals of the device and return the own totals"""
+        device_energy = totals.get("consumption_energy")
+        device_water = totals.get("consumption_water")
+        if device_energy is None or device_water is None:
+            return self._publish()
+
+        if self._device_energy is not None:
+            # Positive, if the integration counted more than the device
+            self._energy_drift = round(
+                self._device_energy + self._energy - device_energy, 3
+            )
+            self._water_drift = round(
+                self._device_water + self._water - device_water, 1
+            )
+            _LOGGER.debug(
+                "Drift of the local consumption of the CLAGE Homeserver '%s': %s kWh, %s l",
+                self._homeserver_name,
+                self._energy_drift,
+                self._water_drift,
+            )
+        self._device_energy = device_energy
+        self._device_water = device_water
+        self._energy = 0.0
+        self._water = 0.0
+        return self._publish()
+
+    def _publish(self):
+        """Return the totals with the units of the consumption sensors"""
+        if self._device_energy is None:
+            # Nothing to integrate on before the first device totals
+            return {}
+        self._published_energy = max(
+            self._published_energy, self._device_energy + self._energy
+        )
+        self._published_water = max(
+            self._published_water, self._device_water + self._water
+        )
+        return {
+            "consumption_energy": round(self._published_energy, 2),  # kWh
+            "consumption_water": round(self._published_water, 1),  # l
+            "consumption_energy_drift": self._energy_drift,  # kWh
+            "consumption_water_drift": self._water_drift,  # l
+        }
@@ -0,0 +1,191 @@
+"""Decoding of the states fetched from the CLAGE Homeserver"""
+import logging
+import math
+from datetime import datetime, timezone
+
+_LOGGER = logging.getLogger(__name__)
+
+POWER_DIGITS = 3
+
+
+def _text(value):
+    """Decode a text, e.g. a version or a serial number"""
+    if isinstance(value, (dict, list, tuple)):
+        raise TypeError(f"{value!r} is no text")
+    return str(value)
+
+
+def _boolean(value):
+    """Decode a boolean, that the API may also send as 0 or 1"""
+    if isinstance(value, bool):
+        return value
+    if value in (0, 1):
+        return bool(value)
+    raise ValueError(f"{value!r} is no boolean")
+
+
+def _number(value):
+    """Decode a finite number"""
+    if isinstance(value, bool):
+        raise TypeError(f"{value!r} is no number")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is no finite number")
+    return number
+
+
+def _integer(value):
+    """Decode an integral number"""
+    number = _number(value)
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is no integer")
+    return int(number)
+
+
+def _number_or_text(value):
+    """Decode a number, that is replaced by a text for special values"""
+    if isinstance(value, str):
+        return value
+    return _number(value)
+
+
+def _first(decoder):
+    """Decode the first element of a tuple the library wraps a value in"""
+
+    def decode(value):
+        if isinstance(value, tuple) and len(value) == 1:
+            value = value[0]
+        return decoder(value)
+
+    return decode
+
+
+def _timestamp(value):
+    """Decode the UTC time of the homeserver to an aware datetime"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, timezone.utc)
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def _power(value):
+    """Decode the power in kW, that the library scales with the powerMax"""
+    power = _number(value)
+    if power < 0:
+        raise ValueError(f"{value!r} is no power")
+    return round(power, POWER_DIGITS)
+
+
+def _flags(value):
+    """Decode a bit field"""
+    flags = _integer(value)
+    if flags < 0:
+        raise ValueError(f"{value!r} is no bit field")
+    return flags
+
+
+# The decoders by the system name of the sensors (see SensorDefinition)
+DECODERS = {
+    "homeserver_version": _text,
+    "homeserver_error": _text,
+    "homeserver_time": _timestamp,
+    "homeserver_success": _boolean,
+    "heater_id": _text,
+    "heater_busId": _integer,
+    "heater_name": _text,
+    "heater_connected": _boolean,
+    "heater_signal": _integer,
+    "heater_rssi": _integer,
+    "heater_lqi": _integer,
+    "heater_status_setpoint": _number,
+    "heater_status_tIn": _number,
+    "heater_status_tOut": _number,
+    "heater_status_tP1": _number,
+    "heater_status_tP2": _number,
+    "heater_status_tP3": _number,
+    "heater_status_tP4": _number,
+    "heater_status_flow": _number,
+    "heater_status_flowMax": _number_or_text,
+    "heater_status_valvePos": _integer,
+    "heater_status_valveFlags": _flags,
+    "heater_status_power": _power,
+    "heater_status_powerMax": _number,
+    "heater_status_power100": _number,
+    "heater_status_error": _text,
+    "heater_setup_swVersion": _text,
+    "heater_setup_serialDevice": _text,
+    "heater_setup_serialPowerUnit": _text,
+    "heater_setup_flowMax": _number,
+    "heater_setup_loadShedding": _first(_number),
+    "heater_setup_scaldProtection": _number,
+    "heater_setup_sound": _integer,
+    "heater_setup_fcpAddr": _integer,
+    "heater_setup_powerCosts": _number,
+    "heater_setup_powerMax": _number,
+    "heater_setup_calValue": _number,
+    "heater_setup_timerPowerOn": _number,
+    "heater_setup_timerLifetime": _number,
+    "heater_setup_timerStandby": _number,
+    "number_of_watertaps": _integer,
+    "usage_time": _number,
+    "consumption_energy": _number,
+    "consumption_water": _number,
+    "consumption_energy_drift": _number,
+    "consumption_water_drift": _number,
+    "last_draw_duration": _number,
+    "last_draw_water": _number,
+    "last_draw_energy": _number,
+    "last_draw_costs": _number,
+    # Fields of the API without a sensor
+    "homeserver_cached": _boolean,
+    "heater_status_fillingLeft": _integer,
+    "heater_status_flags": _flags,
+    "heater_status_sysFlags": _flags,
+}
+
+
+class StateDecoder:
+    """Decode the payloads of a homeserver once per tick into typed values.
+
+    A malformed value is published as None and an unknown field is kept as
+    it is; both are only counted, so a single odd field never fails a tick.
+    """
+
+    def __init__(self, homeserver_name):
+        self._homeserver_name = homeserver_name
+        self._unknown_fields = set()
+        self.unknown = 0
+        self.malformed = 0
+
+    def decode(self, payload):
+        """Return the decoded values of a mapped payload"""
+        decoded = {}
+        for field, value in payload.items():
+            decoder = DECODERS.get(field)
+            if decoder is None:
+                self.unknown += 1
+                if field not in self._unknown_fields:
+                    self._unknown_fields.add(field)
+                    _LOGGER.debug(
+                        "Unknown field '%s' from the CLAGE Homeserver '%s'",
+                        field,
+                        self._homeserver_name,
+                    )
+                decoded[field] = value
+            elif value is None:
+                decoded[field] = None
+            else:
+                try:
+                    decoded[field] = decoder(value)
+                except (TypeError, ValueError, OverflowError, OSError) as err:
+                    self.malformed += 1
+                    _LOGGER.debug(
+                        "Malformed value of '%s' from the CLAGE Homeserver '%s': %s",
+                        field,
+                        self._homeserver_name,
+                        err,
+                    )
+                    decoded[field] = None
+        return decoded
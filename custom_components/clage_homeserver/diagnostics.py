@@ -0,0 +1,40 @@
+"""Diagnostics support for the CLAGE Homeserver"""
+from homeassistant.components.diagnostics import async_redact_data
+
+from .const import (
+    DOMAIN,
+    CONF_NAME,
+    CONF_HOMESERVER_IP_ADDRESS,
+    CONF_HOMESERVER_ID,
+    CONF_HEATER_ID,
+)
+
+TO_REDACT = {CONF_HOMESERVER_IP_ADDRESS, CONF_HOMESERVER_ID, CONF_HEATER_ID}
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return the diagnostics of the homeserver of a config entry"""
+
+    name = entry.data[CONF_NAME]
+    data = hass.data[DOMAIN]
+    coordinator = data["coordinators"][name]
+    heater = data["hub_fetchers"][data["api"][name].ip_address].heaters[name]
+    circuit_breaker = data["circuit_breakers"][name]
+    decoder = data["decoders"][name]
+
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": str(heater.update_interval),
+        },
+        "circuit_breaker": {
+            "state": circuit_breaker.state,
+            "consecutive_failures": circuit_breaker.consecutive_failures,
+        },
+        "requests": data["request_metrics"][name].as_dict(),
+        "decoding": {"unknown": decoder.unknown, "malformed": decoder.malformed},
+        "skipped_state_writes": data["skipped_state_writes"].get(name, 0),
+        "suppressed_writes": data["suppressed_writes"].get(name, 0),
+        "startup_times": data["startup_times"].get(name),
+    }
@@ -0,0 +1,77 @@
+"""Detection of the single draws of water from the status of a heater"""
+from .const import DOMAIN
+
+EVENT_DRAW_STARTED = f"{DOMAIN}_draw_started"
+EVENT_DRAW_FINISHED = f"{DOMAIN}_draw_finished"
+
+# A longer gap between two samples (e.g. an unreachable homeserver) is not
+# integrated, as the flow during the gap is unknown.
+MAX_SAMPLE_GAP = 300  # s
+
+
+class DrawDetector:
+    """Detect the draws of a heater in the stream of its polled status.
+
+    A draw starts with the first sample with a flow or a power and ends with
+    the first sample without both. Water and energy are integrated with the
+    rates of the previous sample, so every sample costs the same, no matter
+    how long the draw or the history is.
+    """
+
+    def __init__(self):
+        self._last_time = None
+        self._last_flow = 0.0  # l/min
+        self._last_power = 0.0  # kW
+        self._start = None
+        self._water = 0.0  # l
+        self._energy = 0.0  # kWh
+
+    @property
+    def drawing(self):
+        """Return True while water is drawn"""
+        return self._start is not None
+
+    def add(self, timestamp, states):
+        """Add a sample (time stamp in s) and return the started or finished draw.
+
+        Return a tuple of the event type and its data, or None.
+        """
+        flow = states.get("heater_status_flow") or 0.0
+        power = states.get("heater_status_power") or 0.0
+
+        if self._start is not None:
+            elapsed = timestamp - self._last_time
+            if 0 < elapsed <= MAX_SAMPLE_GAP:
+                self._water += self._last_flow * elapsed / 60
+                self._energy += self._last_power * elapsed / 3600
+
+        self._last_time = timestamp
+        self._last_flow = flow
+        self._last_power = power
+
+        if flow > 0 or power > 0:
+            if self._start is None:
+                self._start = timestamp
+                self._water = 0.0
+                self._energy = 0.0
+                return EVENT_DRAW_STARTED, {"start": timestamp}
+            return None
+
+        if self._start is None:
+            return None
+
+        power_costs = states.get("heater_setup_powerCosts")  # Cent per kWh
+        draw = {
+            "start": self._start,
+            "end": timestamp,
+            "duration": round(timestamp - self._start),  # s
+            "water": round(self._water, 1),  # l
+            "energy": round(self._energy, 3),  # kWh
+            "costs": (
+                round(self._energy * power_costs, 1)
+                if power_costs is not None
+                else None
+            ),  # Cent
+        }
+        self._start = None
+        return EVENT_DRAW_FINISHED, draw
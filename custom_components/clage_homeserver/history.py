@@ -0,0 +1,129 @@
+"""Compact history of the fast changing samples of a heater"""
+from array import array
+
+DEFAULT_HISTORY_SIZE = 4096
+
+# The sampled fields with the factor to their integral resolution
+# (0.1 l/min, 10 W, 0.1 °C)
+SAMPLED_FIELDS = {
+    "heater_status_flow": 10,
+    "heater_status_power": 100,
+    "heater_status_tIn": 10,
+    "heater_status_tOut": 10,
+}
+
+# Every value is stored in a signed short; limiting the values to half of
+# its range keeps every delta between two values within it.
+MAX_VALUE = 2**14 - 1
+MAX_TIME_DELTA = 2**32 - 1  # ms
+
+
+def _scale(value, factor):
+    return min(max(round(value * factor), -MAX_VALUE), MAX_VALUE)
+
+
+class SampleHistory:
+    """Ring buffer with the recent samples of a heater.
+
+    Only the first sample is stored as it is; every other sample is stored
+    as the difference to its predecessor in fixed size arrays (4 bytes for
+    the time in ms and 2 bytes per value), so a few hours of fast polling
+    only take some kilobytes. When the buffer is full, the oldest sample is
+    folded into the first one.
+    """
+
+    def __init__(self, size=DEFAULT_HISTORY_SIZE):
+        self._size = size
+        self._time_deltas = array("I", [0]) * size
+        self._value_deltas = {field: array("h", [0]) * size for field in SAMPLED_FIELDS}
+        # The oldest sample and the newest sample, that the deltas lead to
+        self._first_time = None
+        self._first_values = {}
+        self._last_time = None
+        self._last_values = {}
+        # The deltas of the samples after the first one, in a ring
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count + (self._first_time is not None)
+
+    def add(self, timestamp, states):
+        """Add the sampled fields of the states at the time stamp (s)"""
+        values = {}
+        for field, factor in SAMPLED_FIELDS.items():
+            value = states.get(field)
+            if not isinstance(value, (int, float)):
+                # A sample with a missing value is not stored at all
+                return
+            values[field] = _scale(value, factor)
+        time_ms = round(timestamp * 1000)
+
+        if self._first_time is None:
+            self._first_time = self._last_time = time_ms
+            self._first_values = dict(values)
+            self._last_values = values
+            return
+
+        time_delta = time_ms - self._last_time
+        if not 0 <= time_delta <= MAX_TIME_DELTA:
+            # The clock jumped; start again rather than store a wrong time
+            self.clear()
+            self.add(timestamp, states)
+            return
+
+        if self._count == self._size:
+            self._drop_first()
+        index = (self._start + self._count) % self._size
+        self._time_deltas[index] = time_delta
+        for field, deltas in self._value_deltas.items():
+            deltas[index] = values[field] - self._last_values[field]
+        self._count += 1
+        self._last_time = time_ms
+        self._last_values = values
+
+    def _drop_first(self):
+        """Fold the delta of the second oldest sample into the first one"""
+        self._first_time += self._time_deltas[self._start]
+        for field, deltas in self._value_deltas.items():
+            self._first_values[field] += deltas[self._start]
+        self._start = (self._start + 1) % self._size
+        self._count -= 1
+
+    def clear(self):
+        """Remove all samples"""
+        self._first_time = self._last_time = None
+        self._first_values = {}
+        self._last_values = {}
+        self._start = 0
+        self._count = 0
+
+    def samples(self, start=None, end=None):
+        """Return the samples between the time stamps start and end (s)"""
+        if self._first_time is None:
+            return []
+
+        start_ms = None if start is None else start * 1000
+        end_ms = None if end is None else end * 1000
+        samples = []
+        time_ms = self._first_time
+        values = dict(self._first_values)
+        for position in range(self._count + 1):
+            if position:
+                index = (self._start + position - 1) % self._size
+                time_ms += self._time_deltas[index]
+                for field, deltas in self._value_deltas.items():
+                    values[field] += deltas[index]
+            if end_ms is not None and time_ms > end_ms:
+                break
+            if start_ms is None or time_ms >= start_ms:
+                samples.append(
+                    (
+                        time_ms / 1000,
+                        {
+                            field: values[field] / factor
+                            for field, factor in SAMPLED_FIELDS.items()
+                        },
+                    )
+                )
+        return samples
@@ -0,0 +1,119 @@
+"""Latency and error metrics of the requests to a homeserver"""
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .api import ClageHomeServerError
+
+ENDPOINT_STATUS = "status"
+ENDPOINT_SETUP = "setup"
+ENDPOINT_CONSUMPTION_TOTALS = "consumption_totals"
+ENDPOINT_CONSUMPTION_LOG = "consumption_log"
+ENDPOINT_SET_TEMPERATURE = "set_temperature"
+
+# The upper bounds of the latency histogram buckets; the last one is open
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # s
+
+
+class EndpointMetrics:
+    """Latency histogram and counters of one endpoint"""
+
+    def __init__(self):
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.last_latency = None
+        self.last_success = None
+
+    def record(self, latency):
+        """Count a request with its latency in s"""
+        self.requests += 1
+        self.last_latency = latency
+        for bucket, upper_bound in enumerate(LATENCY_BUCKETS):
+            if latency <= upper_bound:
+                self.histogram[bucket] += 1
+                return
+        self.histogram[-1] += 1
+
+    def as_dict(self):
+        """Return the metrics for the diagnostics"""
+        histogram = {
+            f"<={upper_bound}s": count
+            for upper_bound, count in zip(LATENCY_BUCKETS, self.histogram)
+        }
+        histogram[f">{LATENCY_BUCKETS[-1]}s"] = self.histogram[-1]
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "last_latency": self.last_latency,
+            "last_success": (
+                self.last_success.isoformat() if self.last_success else None
+            ),
+            "histogram": histogram,
+        }
+
+
+class RequestMetrics:
+    """Metrics of the requests to a homeserver by endpoint"""
+
+    def __init__(self):
+        self.endpoints = {}
+
+    @contextmanager
+    def measure(self, endpoint):
+        """Measure the request within the context"""
+        metrics = self.endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = EndpointMetrics()
+
+        started = time.monotonic()
+        try:
+            yield
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # The fetcher cancels the request, when its timeout is over
+            metrics.timeouts += 1
+            raise
+        except ClageHomeServerError as err:
+            if isinstance(err.__cause__, asyncio.TimeoutError):
+                metrics.timeouts += 1
+            else:
+                metrics.errors += 1
+            raise
+        else:
+            metrics.last_success = datetime.now(timezone.utc)
+        finally:
+            metrics.record(time.monotonic() - started)
+
+    @property
+    def status_latency(self):
+        """Return the latency of the last status request in s"""
+        metrics = self.endpoints.get(ENDPOINT_STATUS)
+        return metrics.last_latency if metrics else None
+
+    @property
+    def failures(self):
+        """Return the number of failed requests of all endpoints"""
+        return sum(
+            metrics.timeouts + metrics.errors for metrics in self.endpoints.values()
+        )
+
+    @property
+    def last_success(self):
+        """Return the time of the last successful request of any endpoint"""
+        return max(
+            (
+                metrics.last_success
+                for metrics in self.endpoints.values()
+                if metrics.last_success
+            ),
+            default=None,
+        )
+
+    def as_dict(self):
+        """Return the metrics of all endpoints for the diagnostics"""
+        return {
+            endpoint: metrics.as_dict() for endpoint, metrics in self.endpoints.items()
+        }
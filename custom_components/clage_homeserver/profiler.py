@@ -0,0 +1,96 @@
+"""Profiling of the polling for a number of coordinator ticks"""
+import cProfile
+import logging
+import pstats
+from datetime import timedelta
+
+from homeassistant import core
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+OVERALL_FUNCTIONS = 50
+MAX_PROFILE_DURATION = timedelta(hours=1)
+
+
+class TickProfiler:
+    """Profile the event loop until every homeserver finished some ticks.
+
+    The fetchers of the homeservers report every finished poll, successful
+    or not, so a tick includes fetching, decoding and updating the sensors.
+    A profile stops after MAX_PROFILE_DURATION at the latest, also when a
+    homeserver never finishes its ticks. Nothing is hooked into the polling
+    while no profile is running.
+    """
+
+    def __init__(self, hass, homeserver_names, ticks, path):
+        self._hass = hass
+        self._remaining_ticks = dict.fromkeys(homeserver_names, ticks)
+        self._path = path
+        self._profile = cProfile.Profile()
+        self._cancel_timeout = None
+        self._stopped = False
+
+    @core.callback
+    def async_start(self):
+        """Start profiling; the profile runs until the ticks are over"""
+        self._cancel_timeout = async_call_later(
+            self._hass, MAX_PROFILE_DURATION, self._async_timeout
+        )
+        _LOGGER.info(
+            "Profiling the next %s ticks of the CLAGE Homeservers %s",
+            max(self._remaining_ticks.values()),
+            ", ".join(self._remaining_ticks),
+        )
+        self._profile.enable()
+
+    @core.callback
+    def async_tick_finished(self, homeserver_name):
+        """Count a finished poll of a homeserver"""
+        if homeserver_name not in self._remaining_ticks:
+            return
+        self._remaining_ticks[homeserver_name] -= 1
+        if self._remaining_ticks[homeserver_name] <= 0:
+            del self._remaining_ticks[homeserver_name]
+        if not self._remaining_ticks:
+            # After the coordinator notified the sensors of the last tick
+            self._hass.loop.call_soon(self._async_stop)
+
+    @core.callback
+    def _async_timeout(self, _now):
+        self._cancel_timeout = None
+        _LOGGER.warning(
+            "Profile of the CLAGE Homeservers stopped after %s, ticks left: %s",
+            MAX_PROFILE_DURATION,
+            self._remaining_ticks,
+        )
+        self._async_stop()
+
+    @core.callback
+    def _async_stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._profile.disable()
+        if self._cancel_timeout is not None:
+            self._cancel_timeout()
+            self._cancel_timeout = None
+        self._hass.async_create_task(self._async_write_report())
+
+    async def _async_write_report(self):
+        try:
+            await self._hass.async_add_executor_job(self._write_report)
+            _LOGGER.info("Profile of the CLAGE Homeservers written to %s", self._path)
+        finally:
+            self._hass.data[DOMAIN]["profiler"] = None
+
+    def _write_report(self):
+        with open(self._path, "w", encoding="utf-8") as report:
+            stats = pstats.Stats(self._profile, stream=report)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE)
+            report.write(f"Functions of {DOMAIN}\n")
+            stats.print_stats(DOMAIN)
+            report.write("All functions\n")
+            stats.print_stats(OVERALL_FUNCTIONS)
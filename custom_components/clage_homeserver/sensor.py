@@ -1,7 +1,11 @@
 """Platform for clage_homeserver sensor integration."""
 import logging
+from datetime import datetime
+from operator import methodcaller
 from .sensor_definition import SensorDefinition
+from .snapshot import STALE
 from homeassistant import core, config_entries
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components.sensor import (
     SensorStateClass,
@@ -32,6 +36,14 @@ from .const import (
     CONF_HOMESERVER_IP_ADDRESS,
     CONF_HOMESERVER_ID,
     CONF_HEATER_ID,
+    CONF_SENSOR_GROUPS,
+    CONF_LOCAL_CONSUMPTION,
+    SENSOR_GROUP_CORE,
+    SENSOR_GROUP_ENERGY,
+    SENSOR_GROUP_DIAGNOSTICS,
+    SENSOR_GROUP_SETUP,
+    SENSOR_GROUPS,
+    SIGNAL_POLLED,
 )
 
 AMPERE = "A"
@@ -41,6 +53,8 @@ PERCENT = "%"
 
 _LOGGER = logging.getLogger(__name__)
 
+_UNPUBLISHED = object()
+
 _sensors = [
     SensorDefinition(
         system_name="homeserver_version",
@@ -50,6 +64,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="homeserver_error",
@@ -59,6 +74,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="homeserver_time",
@@ -68,6 +84,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TIMESTAMP,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="homeserver_success",
@@ -77,6 +94,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_id",
@@ -86,6 +104,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_busId",
@@ -95,6 +114,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_name",
@@ -104,6 +124,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_connected",
@@ -113,6 +134,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_signal",
@@ -122,6 +144,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.SIGNAL_STRENGTH,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_rssi",
@@ -131,6 +154,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.SIGNAL_STRENGTH,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_lqi",
@@ -140,6 +164,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_setpoint",
@@ -149,6 +174,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=None,
+        group=SENSOR_GROUP_CORE,
     ),
     SensorDefinition(
         system_name="heater_status_tIn",
@@ -158,6 +184,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=None,
+        group=SENSOR_GROUP_CORE,
     ),
     SensorDefinition(
         system_name="heater_status_tOut",
@@ -167,6 +194,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=None,
+        group=SENSOR_GROUP_CORE,
     ),
     SensorDefinition(
         system_name="heater_status_tP1",
@@ -176,6 +204,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_tP2",
@@ -185,6 +214,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_tP3",
@@ -194,6 +224,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_tP4",
@@ -203,6 +234,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_flow",
@@ -212,6 +244,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_CORE,
     ),
     SensorDefinition(
         system_name="heater_status_flowMax",
@@ -221,6 +254,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_valvePos",
@@ -230,6 +264,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_CORE,
     ),
     SensorDefinition(
         system_name="heater_status_valveFlags",
@@ -239,6 +274,7 @@ _sensors = [
         state_class=None,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_power",
@@ -248,6 +284,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_CORE,
     ),
     SensorDefinition(
         system_name="heater_status_powerMax",
@@ -257,6 +294,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_power100",
@@ -266,6 +304,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_status_error",
@@ -275,6 +314,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
     SensorDefinition(
         system_name="heater_setup_swVersion",
@@ -284,6 +324,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_serialDevice",
@@ -293,6 +334,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_serialPowerUnit",
@@ -302,6 +344,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_flowMax",
@@ -311,6 +354,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_loadShedding",
@@ -320,6 +364,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_scaldProtection",
@@ -329,6 +374,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_sound",
@@ -338,6 +384,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_fcpAddr",
@@ -347,6 +394,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_powerCosts",
@@ -356,6 +404,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_powerMax",
@@ -365,6 +414,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_calValue",
@@ -374,6 +424,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_timerPowerOn",
@@ -383,6 +434,7 @@ _sensors = [
         state_class=SensorStateClass.MEASUREMENT,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_timerLifetime",
@@ -392,6 +444,7 @@ _sensors = [
         state_class=SensorStateClass.TOTAL_INCREASING,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_SETUP,
     ),
     SensorDefinition(
         system_name="heater_setup_timerStandby",
@@ -401,6 +454,7 @@ _sensors = [
         state_class=SensorStateClass.TOTAL_INCREASING,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_SETUP,
     ),
     # SensorDefinition(
     #     system_name="heater_setup_totalPowerConsumption",
@@ -410,6 +464,7 @@ _sensors = [
     #     state_class=SensorStateClass.TOTAL_INCREASING,
     #     device_class=None,
     #     entity_category=None,
+    #     group=SENSOR_GROUP_SETUP,
     # ),
     # SensorDefinition(
     #     system_name="heater_setup_totalWaterConsumption",
@@ -419,6 +474,7 @@ _sensors = [
     #     state_class=SensorStateClass.TOTAL_INCREASING,
     #     device_class=None,
     #     entity_category=None,
+    #     group=SENSOR_GROUP_SETUP,
     # ),
     SensorDefinition(
         system_name="number_of_watertaps",
@@ -428,6 +484,7 @@ _sensors = [
         state_class=SensorStateClass.TOTAL_INCREASING,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
     ),
     SensorDefinition(
         system_name="usage_time",
@@ -437,6 +494,7 @@ _sensors = [
         state_class=SensorStateClass.TOTAL_INCREASING,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
     ),
     SensorDefinition(
         system_name="consumption_energy",
@@ -446,6 +504,7 @@ _sensors = [
         state_class=SensorStateClass.TOTAL_INCREASING,
         device_class=SensorDeviceClass.ENERGY,
         entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
     ),
     SensorDefinition(
         system_name="consumption_water",
@@ -455,19 +514,166 @@ _sensors = [
         state_class=SensorStateClass.TOTAL_INCREASING,
         device_class=None,
         entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
+    ),
+    SensorDefinition(
+        system_name="last_draw_duration",
+        name="Dauer der letzten Zapfung",
+        definition="Dauer der zuletzt beendeten Zapfung",
+        unit=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=None,
+        entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
+    ),
+    SensorDefinition(
+        system_name="last_draw_water",
+        name="Wasserverbrauch der letzten Zapfung",
+        definition="Aus dem Durchfluss berechnete Wassermenge der zuletzt beendeten Zapfung",
+        unit=UnitOfVolume.LITERS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=None,
+        entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
+    ),
+    SensorDefinition(
+        system_name="last_draw_energy",
+        name="Energieverbrauch der letzten Zapfung",
+        definition="Aus der Leistungsaufnahme berechneter Energieverbrauch der zuletzt beendeten Zapfung",
+        unit=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=None,
+        device_class=SensorDeviceClass.ENERGY,
+        entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
+    ),
+    SensorDefinition(
+        system_name="last_draw_costs",
+        name="Kosten der letzten Zapfung",
+        definition="Energiekosten der zuletzt beendeten Zapfung mit den Kosten pro kWh des Durchlauferhitzers",
+        unit=CURRENCY_CENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=None,
+        entity_category=None,
+        group=SENSOR_GROUP_ENERGY,
+    ),
+]
+
+
+# Diagnostic sensors, that only have a state with the local consumption
+_local_consumption_sensors = [
+    SensorDefinition(
+        system_name="consumption_energy_drift",
+        name="Abweichung Energieverbrauch",
+        definition="Abweichung des lokal berechneten vom gemeldeten Energieverbrauch beim letzten Abgleich",
+        unit=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_ENERGY,
+    ),
+    SensorDefinition(
+        system_name="consumption_water_drift",
+        name="Abweichung Wasserverbrauch",
+        definition="Abweichung des lokal berechneten vom gemeldeten Wasserverbrauch beim letzten Abgleich",
+        unit=UnitOfVolume.LITERS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_ENERGY,
+    ),
+]
+
+
+# Diagnostic sensors with the request metrics of the homeserver
+_request_metrics_sensors = [
+    SensorDefinition(
+        system_name="homeserver_request_latency",
+        name="Antwortzeit Status",
+        definition="Dauer der letzten Statusabfrage des Homeservers",
+        unit=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
+    ),
+    SensorDefinition(
+        system_name="homeserver_request_failures",
+        name="Fehlgeschlagene Anfragen",
+        definition="Anzahl der Anfragen an den Homeserver mit Fehler oder Zeitüberschreitung",
+        unit=None,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
+    ),
+    SensorDefinition(
+        system_name="homeserver_last_success",
+        name="Letzte erfolgreiche Anfrage",
+        definition="Zeitpunkt der letzten erfolgreichen Anfrage an den Homeserver",
+        unit=None,
+        state_class=None,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        group=SENSOR_GROUP_DIAGNOSTICS,
     ),
 ]
 
 
 def _create_sensors_for_homeserver(
-    homeserver_name, homeserver_ip_address, homeserver_id, heater_id, hass
+    homeserver_name,
+    homeserver_ip_address,
+    homeserver_id,
+    heater_id,
+    hass,
+    sensor_groups=SENSOR_GROUPS,
+    local_consumption=False,
 ):
     _entities = []
-    for _sensor in _sensors:
+    if SENSOR_GROUP_DIAGNOSTICS in sensor_groups:
+        _entities.append(
+            ClageHomeserverCircuitBreakerSensor(
+                circuit_breaker=hass.data[DOMAIN]["circuit_breakers"][homeserver_name],
+                coordinator=hass.data[DOMAIN]["coordinators"][homeserver_name],
+                entity_id=f"sensor.clagehomeserver_{homeserver_name}_homeserver_circuit_breaker",
+                homeserver_name=homeserver_name,
+                homeserver_ip_address=homeserver_ip_address,
+                homeserver_id=homeserver_id,
+                heater_id=heater_id,
+                name="Verbindungsüberwachung",
+                attribute="homeserver_circuit_breaker",
+                unit=None,
+                state_class=None,
+                device_class=None,
+                entity_category=EntityCategory.DIAGNOSTIC,
+            )
+        )
+        for _sensor in _request_metrics_sensors:
+            _entities.append(
+                ClageHomeserverRequestMetricsSensor(
+                    request_metrics=hass.data[DOMAIN]["request_metrics"][
+                        homeserver_name
+                    ],
+                    coordinator=hass.data[DOMAIN]["coordinators"][homeserver_name],
+                    entity_id=f"sensor.clagehomeserver_{homeserver_name}_{_sensor.system_name}",
+                    homeserver_name=homeserver_name,
+                    homeserver_ip_address=homeserver_ip_address,
+                    homeserver_id=homeserver_id,
+                    heater_id=heater_id,
+                    name=_sensor.name,
+                    attribute=_sensor.system_name,
+                    unit=_sensor.unit,
+                    state_class=_sensor.state_class,
+                    device_class=_sensor.device_class,
+                    entity_category=_sensor.entity_category,
+                )
+            )
+    for _sensor in _sensors + (_local_consumption_sensors if local_consumption else []):
+        if _sensor.group not in sensor_groups:
+            continue
         _LOGGER.debug("Adding Sensor: %s for homeserver %s", _sensor, homeserver_name)
         _entities.append(
             ClageHomeserverSensor(
-                coordinator=hass.data[DOMAIN]["coordinator"],
+                coordinator=hass.data[DOMAIN]["coordinators"][homeserver_name],
                 entity_id=f"sensor.clagehomeserver_{homeserver_name}_{_sensor.system_name}",
                 homeserver_name=homeserver_name,
                 homeserver_ip_address=homeserver_ip_address,
@@ -504,6 +710,8 @@ async def async_setup_entry(
             _config[CONF_HOMESERVER_ID],
             _config[CONF_HEATER_ID],
             hass,
+            _config.get(CONF_SENSOR_GROUPS, SENSOR_GROUPS),
+            _config.get(CONF_LOCAL_CONSUMPTION, False),
         )
     )
 
@@ -527,6 +735,8 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
                 homeserver[0][CONF_HOMESERVER_ID],
                 homeserver[0][CONF_HEATER_ID],
                 hass,
+                discovery_info.get(CONF_SENSOR_GROUPS, SENSOR_GROUPS),
+                discovery_info.get(CONF_LOCAL_CONSUMPTION, False),
             )
         )
 
@@ -559,40 +769,173 @@ class ClageHomeserverSensor(CoordinatorEntity, SensorEntity):
         self.homeserver_id = homeserver_id
         self.heater_id = heater_id
         self.entity_id = entity_id
-        self._name = name
         self._attribute = attribute
         self._unit = unit
+        # Everything, that does not change, is computed once here instead of
+        # in the properties, that are read on every state write. A restored
+        # snapshot may lack the fields of newer versions, hence get.
+        self._value = methodcaller("get", attribute)
+        self._attr_name = name
+        self._attr_unique_id = f"{homeserver_name}_{attribute}"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, homeserver_name)},
+            "name": homeserver_name,
+            "manufacturer": "CLAGE GmbH",
+            "model": f"DSX Touch {heater_id}@{homeserver_id}",
+            "configuration_url": f"https://{homeserver_ip_address}",
+        }
         self._attr_state_class = state_class
         self._attr_device_class = device_class
         if entity_category is not None:
             self._attr_entity_category = entity_category
+        self._published_state = _UNPUBLISHED
 
-    @property
-    def device_info(self):
-        return {
-            "identifiers": {(DOMAIN, self.homeservername)},
-            "name": self.homeservername,
-            "manufacturer": "CLAGE GmbH",
-            "model": f"DSX Touch {self.heater_id}@{self.homeserver_id}",
-            "configuration_url": f"https://{self.homeserver_ip_address}",
-        }
+    def _published_value(self):
+        """Return what decides, whether the state has to be written again."""
+        data = self.coordinator.data
+        if not data:
+            return (self.available, None, False)
+        return (self.available, self._value(data), data.get(STALE, False))
 
-    @property
-    def name(self):
-        """Return the name of the sensor."""
-        return self._name
+    @core.callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if the value or the availability changed."""
+        published_state = self._published_value()
+        if published_state == self._published_state:
+            skipped_state_writes = self.hass.data[DOMAIN]["skipped_state_writes"]
+            skipped_state_writes[self.homeservername] = (
+                skipped_state_writes.get(self.homeservername, 0) + 1
+            )
+            return
+        self._published_state = published_state
+        self.async_write_ha_state()
 
     @property
-    def unique_id(self):
-        """Return the unique_id of the sensor."""
-        return f"{self.homeservername}_{self._attribute}"
+    def available(self):
+        """Return True, if there are states of the homeserver."""
+        return super().available and self.coordinator.data is not None
 
     @property
     def state(self):
         """Return the state of the sensor."""
-        return self.coordinator.data[self.homeservername][self._attribute]
+        data = self.coordinator.data
+        value = self._value(data) if data else None
+        if isinstance(value, datetime):
+            # The state of a timestamp is ISO 8601, not str(datetime)
+            return value.isoformat()
+        return value
+
+    @property
+    def extra_state_attributes(self):
+        """Mark the states restored from the last run as stale."""
+        data = self.coordinator.data
+        if data and data.get(STALE):
+            return {STALE: True}
+        return None
 
     @property
     def unit_of_measurement(self):
         """Return the unit of measurement."""
         return self._unit
+
+
+class ClageHomeserverPollSensor(ClageHomeserverSensor):
+    """Diagnostic sensor about the polling, updated after every poll.
+
+    The coordinator does not notify its listeners about a failed poll after
+    a failed one, which is when these sensors are needed most.
+    """
+
+    async def async_added_to_hass(self) -> None:
+        """Also update the state after the polls, the coordinator skips."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_POLLED.format(self.homeservername),
+                self._handle_coordinator_update,
+            )
+        )
+
+    @property
+    def available(self):
+        """The polling is also known, when the homeserver is not."""
+        return True
+
+
+class ClageHomeserverCircuitBreakerSensor(ClageHomeserverPollSensor):
+    """Diagnostic sensor with the circuit breaker state of a homeserver."""
+
+    def __init__(self, circuit_breaker, **kwargs):
+        """Initializes the circuit breaker sensor."""
+
+        super().__init__(**kwargs)
+        self._circuit_breaker = circuit_breaker
+
+    @property
+    def state(self):
+        """Return the state of the circuit breaker."""
+        return self._circuit_breaker.state
+
+    @property
+    def extra_state_attributes(self):
+        """Return the failures and the delay until the next retry."""
+        retry_in = self._circuit_breaker.retry_in
+        return {
+            "consecutive_failures": self._circuit_breaker.consecutive_failures,
+            "retry_in": retry_in.total_seconds() if retry_in else None,
+        }
+
+    def _published_value(self):
+        """Return what decides, whether the state has to be written again."""
+        return (
+            self._circuit_breaker.state,
+            self._circuit_breaker.consecutive_failures,
+        )
+
+
+class ClageHomeserverRequestMetricsSensor(ClageHomeserverPollSensor):
+    """Diagnostic sensor with the request metrics of a homeserver."""
+
+    # The state of the timestamp is formatted from the native value
+    state = SensorEntity.state
+
+    def __init__(self, request_metrics, **kwargs):
+        """Initializes the request metrics sensor."""
+
+        super().__init__(**kwargs)
+        self._request_metrics = request_metrics
+
+    @property
+    def native_value(self):
+        """Return the metric of the sensor."""
+        if self._attribute == "homeserver_request_latency":
+            latency = self._request_metrics.status_latency
+            return round(latency * 1000) if latency is not None else None
+        if self._attribute == "homeserver_request_failures":
+            return self._request_metrics.failures
+        return self._request_metrics.last_success
+
+    @property
+    def extra_state_attributes(self):
+        """Return the metric of every endpoint."""
+        if self._attribute == "homeserver_request_latency":
+            return {
+                f"{endpoint}_latency": (
+                    round(metrics.last_latency * 1000)
+                    if metrics.last_latency is not None
+                    else None
+                )
+                for endpoint, metrics in self._request_metrics.endpoints.items()
+            }
+        if self._attribute == "homeserver_request_failures":
+            attributes = {}
+            for endpoint, metrics in self._request_metrics.endpoints.items():
+                attributes[f"{endpoint}_timeouts"] = metrics.timeouts
+                attributes[f"{endpoint}_errors"] = metrics.errors
+            return attributes
+        return None
+
+    def _published_value(self):
+        """Return what decides, whether the state has to be written again."""
+        return (self.native_value, self.extra_state_attributes)
@@ -1,8 +1,14 @@
 """ Module for the structured defition of the a sensor"""
+from dataclasses import dataclass
 
 
+@dataclass(frozen=True, slots=True)
 class SensorDefinition:
-    """An class for the definition of a sensor."""
+    """An class for the definition of a sensor.
+
+    The definitions are immutable and slotted, as every entity of every
+    heater refers to them.
+    """
 
     system_name: str
     """The technical name of a sensor, that can be used in automations; e.g. my_great_sensor"""
@@ -25,20 +31,5 @@ class SensorDefinition:
     entity_category: str
     """"""
 
-    def __init__(
-        self,
-        system_name,
-        name,
-        definition,
-        unit,
-        state_class,
-        device_class,
-        entity_category,
-    ):
-        self.system_name = system_name
-        self.name = name
-        self.definition = definition
-        self.unit = unit
-        self.state_class = state_class
-        self.device_class = device_class
-        self.entity_category = entity_category
+    group: str
+    """The sensor group (see SENSOR_GROUPS), that can be switched off as a whole"""
@@ -0,0 +1,52 @@
+"""Snapshot of the last states of a homeserver, restored after a restart"""
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.snapshot.{{}}"
+SNAPSHOT_SAVE_DELAY = 60
+
+# The state, that marks the states restored from the last run
+STALE = "stale"
+
+
+class StateSnapshot:
+    """The last fetched states of a homeserver, persisted across restarts.
+
+    The states are saved at most every SNAPSHOT_SAVE_DELAY seconds and when
+    Home Assistant stops, so the sensors can publish them at once on the
+    next start instead of waiting for the first poll.
+    """
+
+    def __init__(self, hass, homeserver_name):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(homeserver_name))
+        self._states = None
+        self._save_pending = False
+
+    async def async_load(self):
+        """Return the saved states or None"""
+        return await self._store.async_load()
+
+    def save(self, states):
+        """Save the states with the next delayed write"""
+        self._states = states
+        if not self._save_pending:
+            # A new delay on every tick would postpone the write forever
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    async def async_flush(self):
+        """Write a delayed save at once, e.g. before the homeserver is unloaded"""
+        if self._save_pending:
+            await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self):
+        self._save_pending = False
+        return self._states
+
+
+async def async_remove_snapshot(hass, homeserver_name):
+    """Remove the saved states of a removed homeserver"""
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(homeserver_name))
+    await store.async_remove()